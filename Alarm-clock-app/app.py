@@ -1,228 +1,713 @@
 # app.py
-from flask import Flask, render_template, request, redirect, url_for, session, flash
-from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from flask import (Blueprint, Flask, current_app, g, render_template, request, redirect, url_for,
+                   session, flash, stream_with_context)
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+import base64
+import csv
+import hashlib
+import hmac
+import io
+import json
 import os
+import threading
+import time
 
-app = Flask(__name__, template_folder='template')
-app.config['SECRET_KEY'] = 'your_secret_key_here'  # Change this to a random secret
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///database.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {"connect_args": {"check_same_thread": False}}
-
-db = SQLAlchemy(app)
-
-# User model for login/register
-class User(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(150), unique=True, nullable=False)
-    password = db.Column(db.String(150), nullable=False)
-
-# Alarm model to store alarms
-class Alarm(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    name = db.Column(db.String(100), nullable=False)
-    alarm_time = db.Column(db.String(5), nullable=False)  # Format: HH:MM
-    repeat_type = db.Column(db.String(20), nullable=False, default='once')  # once, daily, weekdays, weekends
-    sound_type = db.Column(db.String(20), nullable=False, default='bell')  # bell, chime, digital, voice
-    volume = db.Column(db.Integer, nullable=False, default=80)  # 0-100
-    is_active = db.Column(db.Boolean, nullable=False, default=True)
-    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-
-# Study session model
-class StudySession(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    subject = db.Column(db.String(100), nullable=False)
-    start_time = db.Column(db.DateTime, nullable=False)
-    duration = db.Column(db.Integer, nullable=False)  # in minutes
-    status = db.Column(db.String(20), nullable=False, default='upcoming')  # upcoming, active, completed
-    notes = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    book_id = db.Column(db.Integer, db.ForeignKey('book.id'), nullable=True)
-
-# Book model for library management
-class Book(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    title = db.Column(db.String(200), nullable=False)
-    author = db.Column(db.String(100), nullable=False)
-    category = db.Column(db.String(50), nullable=False)
-    description = db.Column(db.Text)
-    cover_image = db.Column(db.String(200))  # URL or path to book cover
-    status = db.Column(db.String(20), default='available')  # available, borrowed
-    total_pages = db.Column(db.Integer)
-    current_page = db.Column(db.Integer, default=0)
-    reading_progress = db.Column(db.Float, default=0.0)  # percentage
-    study_sessions = db.relationship('StudySession', backref='book', lazy=True)
-    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-
-# Create DB if not exists
-with app.app_context():
+import click
+from sqlalchemy import event
+
+import archive
+import assets
+import changes
+import migrations
+import planner
+import rollups
+import routing
+import search
+from cache import CatalogCache, UserCache, UserKeyedCache
+from config import CONFIGS
+from events import EventBroker, StreamsFull
+from metrics import RequestMetrics
+from models import db, new_session_key, User, Alarm, AlarmEvent, StudySession, StudySessionArchive, StudyRollup, Book
+from passwords import HasherBusy, PasswordHasher
+from ratelimit import TokenBucketLimiter
+from scheduler import AlarmScheduler, TransitionWorker
+from seed import seed_command
+from session_store import MemorySessionStore, ServerSideSessionInterface, SQLiteSessionStore
+from sqlite_tuning import WriteSerializer, apply_pragmas
+from write_behind import WriteBehindQueue
+
+bp = Blueprint('main', __name__, cli_group=None)
+
+# One writer at a time per process (see sqlite_tuning)
+write_serializer = WriteSerializer(timeout=30)
+write_serializer.install(db.session)
+# Marks sessions that wrote, for read-your-own-writes (see routing)
+routing.install(db.session)
+
+@bp.cli.command('create-db')
+def create_db_command():
+    """Create any missing tables."""
     db.create_all()
-    
-@app.route('/')
+    click.echo('Database tables created successfully!')
+
+bp.cli.add_command(seed_command)
+bp.cli.add_command(rollups.backfill_rollups_command)
+bp.cli.add_command(assets.build_assets_command)
+bp.cli.add_command(archive.archive_sessions_command)
+
+@bp.cli.command('migrate')
+def migrate_command():
+    """Add missing tables, columns and indexes to an existing database."""
+    applied = migrations.upgrade(db)
+    with db.engine.begin() as conn:
+        if search.create_index(conn):
+            applied.append(f"search index {search.INDEX}")
+        if changes.create_sequence(conn):
+            applied.append(f"change sequence {changes.COUNTER}")
+    for change in applied:
+        click.echo(f"Applied: {change}")
+    click.echo('Database is up to date.' if not applied else f'{len(applied)} change(s) applied.')
+
+# Server-side alarm scheduler: one timer wakeup per actual alarm fire
+def _active_alarm_rows():
+    return db.session.query(
+        Alarm.id, Alarm.user_id, Alarm.alarm_time, Alarm.repeat_type
+    ).filter(Alarm.is_active == True, Alarm.deleted_at.is_(None)).all()
+
+def _on_alarm_fired(app, entry):
+    with app.app_context():
+        alarm = db.session.get(Alarm, entry.alarm_id)
+        # The entry may predate a switch-off or an edit whose reschedule
+        # has not reached the scheduler yet (e.g. made by another worker)
+        if (not alarm or alarm.deleted_at is not None or not alarm.is_active
+                or (alarm.alarm_time, alarm.repeat_type) != (entry.alarm_time, entry.repeat_type)):
+            return
+        data = serialize_alarm(alarm)
+        data['fire_at'] = entry.fire_at.strftime("%Y-%m-%d %H:%M:%S")
+        event_broker.publish(alarm.user_id, 'alarm_fired', data)
+
+        # One-off alarms switch themselves off once they have rung
+        if entry.repeat_type == 'once':
+            alarm.is_active = False
+            db.session.commit()
+            stats_changed(alarm.user_id)
+
+alarm_scheduler = AlarmScheduler()
+
+# Per-user push channel for /api/events
+event_broker = EventBroker()
+
+# Dashboard counters per user, invalidated by the alarm/session/book writes
+dashboard_stats_cache = UserCache()
+
+# Each user's current session key (User.session_key), briefly cached
+session_key_cache = UserCache()
+
+request_metrics = RequestMetrics()
+
+# Book catalog responses are the same for every user, so one shared cache
+# serves them; any committed write to a book or a book's sessions moves it
+# to a new version
+catalog_cache = CatalogCache()
+
+def _note_catalog_writes(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Book) or (isinstance(obj, StudySession) and (
+                obj.book_id is not None or db.inspect(obj).attrs.book_id.history.deleted)):
+            session.info['catalog_changed'] = True
+            return
+
+def _note_catalog_statements(orm_execute_state):
+    # Bulk session statements call note_catalog_sessions() with the rows
+    # they touch: most sessions have no book and leave the catalog alone
+    if (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete) and any(
+            mapper.class_ is Book for mapper in orm_execute_state.all_mappers):
+        orm_execute_state.session.info['catalog_changed'] = True
+
+def note_catalog_sessions(book_ids):
+    """Bump the catalog on commit if a bulk write touched a session with a book."""
+    if any(book_id is not None for book_id in book_ids):
+        db.session.info['catalog_changed'] = True
+
+def _bump_catalog_on_commit(session):
+    if session.info.pop('catalog_changed', False):
+        catalog_cache.bump()
+
+def _forget_catalog_writes(session):
+    session.info.pop('catalog_changed', None)
+
+event.listen(db.session, 'after_flush', _note_catalog_writes)
+event.listen(db.session, 'do_orm_execute', _note_catalog_statements)
+event.listen(db.session, 'after_commit', _bump_catalog_on_commit)
+event.listen(db.session, 'after_rollback', _forget_catalog_writes)
+
+# Daily study rollups change in the same transaction as the sessions;
+# bulk statements (the batch routes) call rollups.apply_changes themselves.
+# Updated and deleted sessions' previous state is read under the write
+# lock before the flush writes them (see rollups.locked_states)
+def _lock_rollup_states(session, flush_context, instances):
+    ids = [obj.id for obj in session.dirty
+           if isinstance(obj, StudySession) and rollups.pending_changes(obj)]
+    ids += [obj.id for obj in session.deleted if isinstance(obj, StudySession)]
+    session.info['rollup_before'] = rollups.locked_states(session, ids)
+
+def _update_rollups(session, flush_context):
+    before = session.info.pop('rollup_before', {})
+    changes = [(None, rollups.session_state(obj))
+               for obj in session.new if isinstance(obj, StudySession)]
+    changes += [(before[obj.id], {**before[obj.id], **rollups.pending_changes(obj)})
+                for obj in session.dirty if isinstance(obj, StudySession) and obj.id in before]
+    changes += [(before[obj.id], None)
+                for obj in session.deleted if isinstance(obj, StudySession) and obj.id in before]
+    if changes:
+        rollups.apply_changes(session.connection(), changes)
+
+event.listen(db.session, 'before_flush', _lock_rollup_states)
+event.listen(db.session, 'after_flush', _update_rollups)
+
+# Expanded calendar weeks per (user, week); any alarm or session write drops them
+calendar_cache = UserKeyedCache()
+
+def stats_changed(user_id):
+    dashboard_stats_cache.invalidate(user_id)
+    calendar_cache.invalidate(user_id)
+    event_broker.publish(user_id, 'stats_changed')
+
+def _load_dashboard_stats(user_id, today):
+    day_start = today.replace(hour=0, minute=0, second=0, microsecond=0)
+    day_end = today.replace(hour=23, minute=59, second=59, microsecond=0)
+    todays_sessions = db.and_(
+        StudySession.user_id == user_id,
+        StudySession.deleted_at.is_(None),
+        StudySession.start_time >= day_start,
+        StudySession.start_time <= day_end
+    )
+    # All four counters in a single SQL round trip
+    row = db.session.execute(db.select(
+        db.select(db.func.count(Alarm.id)).where(
+            Alarm.user_id == user_id,
+            Alarm.is_active == True,
+            Alarm.deleted_at.is_(None)
+        ).scalar_subquery(),
+        db.select(db.func.count(StudySession.id)).where(todays_sessions).scalar_subquery(),
+        db.select(db.func.count(Book.id)).where(
+            Book.reading_progress > 0,
+            Book.reading_progress < 100
+        ).scalar_subquery(),
+        db.select(db.func.coalesce(db.func.sum(StudySession.duration), 0)).where(
+            todays_sessions,
+            StudySession.status == 'completed'
+        ).scalar_subquery()
+    )).one()
+    return {
+        'active_alarms': row[0],
+        'today_sessions': row[1],
+        'active_books': row[2],
+        'today_study_time': row[3]
+    }
+
+# Cross-worker change feed: every worker process keeps its own scheduler
+# heap, event streams and caches, so each one picks up the alarm and
+# session writes made by the others by their change numbers (changes.py)
+change_feed_started = threading.Event()
+change_feed_lock = threading.Lock()
+
+def _poll_changes(since):
+    # Every change up to `upto` has committed, so the queries below (each
+    # its own snapshot) see all of them, and the next poll starts there
+    upto = changes.current(db.session)
+    alarms = Alarm.query.filter(Alarm.change_seq > since, Alarm.change_seq <= upto).all()
+    session_changes = db.session.execute(
+        db.select(StudySession.user_id, db.func.max(StudySession.book_id)).where(
+            StudySession.change_seq > since, StudySession.change_seq <= upto
+        ).group_by(StudySession.user_id)
+    ).all()
+
+    for alarm in alarms:
+        if alarm.deleted_at is None:
+            schedule_alarm(alarm)
+        else:
+            alarm_scheduler.remove(alarm.id)
+    for user_id in {alarm.user_id for alarm in alarms} | {user_id for user_id, _ in session_changes}:
+        stats_changed(user_id)
+    if session_changes:
+        session_status_worker.wake()
+    if any(book_id is not None for _, book_id in session_changes):
+        catalog_cache.bump()
+
+    return upto
+
+def _run_change_feed(app, interval, since):
+    while True:
+        time.sleep(interval)
+        try:
+            with app.app_context():
+                since = _poll_changes(since)
+        except Exception:
+            app.logger.exception('Change feed error')
+
+def start_change_feed(app, interval):
+    with change_feed_lock:
+        if change_feed_started.is_set():
+            return
+        threading.Thread(target=_run_change_feed, args=(app, interval, changes.current(db.session)),
+                         name='change-feed', daemon=True).start()
+        change_feed_started.set()
+
+# Session statuses follow the clock: upcoming -> active at start_time,
+# -> completed at start_time + duration. One bulk UPDATE per transition
+# kind, then sleep until the earliest pending transition.
+SESSION_END = db.func.datetime(StudySession.start_time, db.func.printf('+%d minutes', StudySession.duration))
+SESSION_STATE_COLUMNS = (StudySession.id, StudySession.user_id, StudySession.subject,
+                         StudySession.start_time, StudySession.duration, StudySession.book_id,
+                         StudySession.status)
+
+def _transition_sessions(condition, status):
+    return db.session.execute(
+        db.update(StudySession).where(StudySession.deleted_at.is_(None), condition)
+        .values(status=status, updated_at=datetime.utcnow())
+        .returning(*SESSION_STATE_COLUMNS),
+        execution_options={'synchronize_session': False}
+    ).all()
+
+def _next_session_transition():
+    live = StudySession.deleted_at.is_(None)
+    next_start = db.session.query(db.func.min(StudySession.start_time)).filter(
+        live, StudySession.status == 'upcoming').scalar()
+    next_end = db.session.query(db.func.min(SESSION_END)).filter(
+        live, StudySession.status == 'active').scalar()
+    pending = [when for when in (next_start, next_end and datetime.fromisoformat(next_end)) if when]
+    return min(pending) if pending else None
+
+def _advance_session_statuses(app):
+    with app.app_context():
+        # Wakeups after unrelated writes stay read-only
+        now = datetime.now()
+        next_at = _next_session_transition()
+        if next_at is None or next_at > now:
+            return next_at
+
+        ended = _transition_sessions(db.and_(
+            StudySession.status.in_(('upcoming', 'active')),
+            StudySession.start_time <= now,
+            SESSION_END <= now.strftime('%Y-%m-%d %H:%M:%S')
+        ), 'completed')
+        started = _transition_sessions(db.and_(
+            StudySession.status == 'upcoming',
+            StudySession.start_time <= now
+        ), 'active')
+        note_catalog_sessions(row.book_id for row in started + ended)
+        if ended:
+            rollups.apply_changes(db.session.connection(), [
+                ({**row._mapping, 'status': 'active', 'deleted_at': None}, {**row._mapping, 'deleted_at': None})
+                for row in ended
+            ])
+        db.session.commit()
+
+        for row in started:
+            publish_session_status(row, 'upcoming')
+        for row in ended:
+            publish_session_status(row, 'active')
+        for user_id in {row.user_id for row in started} | {row.user_id for row in ended}:
+            stats_changed(user_id)
+        return _next_session_transition()
+
+session_status_worker = TransitionWorker(name='session-status')
+
+# Optional periodic archival of old sessions (archive.py); the
+# archive-sessions command does the same from cron
+def _archive_old_sessions(app):
+    with app.app_context():
+        count = archive.archive_sessions(archive.horizon(), app.config['ARCHIVE_BATCH_SIZE'],
+                                         app.config['ARCHIVE_PAUSE_SECONDS'])
+        if count:
+            app.logger.info('Archived %d study sessions', count)
+
+session_archive_worker = TransitionWorker(name='session-archive')
+
+def get_dashboard_stats(user_id):
+    today = datetime.now()
+    return dashboard_stats_cache.get_or_load(
+        user_id, today.date(), lambda: _load_dashboard_stats(user_id, today))
+
+@bp.before_app_request
+def start_alarm_scheduler():
+    # Background threads start with the first request, never at import
+    interval = current_app.config['CHANGE_FEED_SECONDS']
+    if interval and not change_feed_started.is_set():
+        start_change_feed(current_app._get_current_object(), interval)
+    if not alarm_scheduler.running:
+        alarm_scheduler.start(load=_active_alarm_rows)
+    if not session_status_worker.running:
+        session_status_worker.start()
+    if current_app.config['ARCHIVE_INTERVAL_SECONDS'] and not session_archive_worker.running:
+        session_archive_worker.start()
+    if not alarm_event_queue.running:
+        alarm_event_queue.start(current_app._get_current_object())
+
+def schedule_alarm(alarm):
+    alarm_scheduler.schedule(alarm.id, alarm.user_id, alarm.alarm_time,
+                             alarm.repeat_type, bool(alarm.is_active))
+
+
+@bp.route('/')
 def main():
     return render_template('auth/main.html')
 
-@app.route('/login', methods=['GET', 'POST'])
+# Password checks run in a bounded pool; see passwords.py
+password_hasher = PasswordHasher()
+
+# Login and registration attempts, per client IP and per username
+auth_ip_limiter = TokenBucketLimiter()
+auth_username_limiter = TokenBucketLimiter()
+
+def throttle_auth(template, username):
+    """A 429 page when this client or username is out of attempts, else None."""
+    if not current_app.config['AUTH_RATE_LIMITS']:
+        return None
+    # remote_addr is the proxy's address unless ProxyFix is configured
+    for limiter, key in ((auth_ip_limiter, request.remote_addr),
+                         (auth_username_limiter, (username or '').strip().lower())):
+        allowed, retry_after = limiter.allow(key)
+        if not allowed:
+            flash('Too many attempts. Please wait a minute and try again.')
+            response = make_response(render_template(template), 429)
+            response.headers['Retry-After'] = str(int(retry_after) + 1)
+            return response
+    return None
+
+def hasher_busy(template):
+    flash('The server is busy. Please try again in a moment.')
+    response = make_response(render_template(template), 503)
+    response.headers['Retry-After'] = '1'
+    return response
+
+# The logged-in user's id and username, kept in the server-side session
+# so most requests need no User lookup
+Identity = namedtuple('Identity', 'id username')
+
+def log_in(user_id, username, session_key):
+    # A new session id on login, so an id planted beforehand is useless
+    session.regenerate()
+    session['user_id'] = user_id
+    session['user'] = {'id': user_id, 'username': username, 'key': session_key}
+
+def _session_key(user_id):
+    return session_key_cache.get_or_load(user_id, None, lambda: db.session.execute(
+        db.select(User.session_key).filter_by(id=user_id)).scalar())
+
+def _load_current_user():
+    user_id = session.get('user_id')
+    if user_id is None:
+        return None
+    cached = session.get('user')
+    if cached is None or cached['id'] != user_id:
+        row = db.session.execute(
+            db.select(User.id, User.username, User.session_key).filter_by(id=user_id)
+        ).first()
+        if row is None:
+            session.clear()
+            return None
+        cached = session['user'] = {'id': row.id, 'username': row.username, 'key': row.session_key}
+    elif cached.get('key') is None or cached['key'] != _session_key(user_id):
+        # The account was deleted or its sessions revoked since login
+        session.clear()
+        return None
+    return Identity(cached['id'], cached['username'])
+
+def current_user():
+    """The logged-in user's Identity, or None; loaded at most once per request."""
+    if 'current_user' not in g:
+        g.current_user = _load_current_user()
+    return g.current_user
+
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
-        user = User.query.filter_by(username=username, password=password).first()
-        if user:
-            session['user_id'] = user.id
+        throttled = throttle_auth('auth/login.html', username)
+        if throttled:
+            return throttled
+
+        user = db.session.execute(
+            db.select(User.id, User.password, User.session_key).filter_by(username=username)
+        ).first()
+        # Hand the connection back while the pool hashes
+        db.session.close()
+        try:
+            matches, needs_rehash = password_hasher.verify(user.password if user else None, password)
+            if needs_rehash:
+                # Plaintext or an older method: store a current hash, unless
+                # the password changed meanwhile
+                db.session.execute(db.update(User).where(
+                    User.id == user.id, User.password == user.password
+                ).values(password=password_hasher.hash(password)))
+                db.session.commit()
+        except HasherBusy:
+            return hasher_busy('auth/login.html')
+
+        if matches:
+            log_in(user.id, username, user.session_key)
             flash('Welcome back!')
-            return redirect(url_for('dashboard'))
+            return redirect(url_for('main.dashboard'))
         else:
             flash('Invalid email or password!')
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
     
     return render_template('auth/login.html')
 
-@app.route('/register', methods=['GET', 'POST'])
+@bp.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
         username = request.form.get('username')
         password = request.form.get('password')
         confirm_password = request.form.get('confirm_password')
+        throttled = throttle_auth('auth/register.html', username)
+        if throttled:
+            return throttled
         
         if not username or not password or not confirm_password:
             flash('All fields are required!')
-            return redirect(url_for('register'))
+            return redirect(url_for('main.register'))
             
         if len(password) < 6:
             flash('Password must be at least 6 characters long!')
-            return redirect(url_for('register'))
+            return redirect(url_for('main.register'))
         
         if password != confirm_password:
             flash('Passwords do not match!')
-            return redirect(url_for('register'))
+            return redirect(url_for('main.register'))
         
         existing_user = User.query.filter_by(username=username).first()
         if existing_user:
             flash('Email already registered! Please login.')
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
         
         try:
-            new_user = User(username=username, password=password)
+            session_key = new_session_key()
+            new_user = User(username=username, password=password_hasher.hash(password), session_key=session_key)
             db.session.add(new_user)
             db.session.commit()
             
-            session['user_id'] = new_user.id
+            log_in(new_user.id, username, session_key)
             flash('Account created successfully! Welcome to LibraryAlarm!')
-            return redirect(url_for('dashboard'))
+            return redirect(url_for('main.dashboard'))
+        except HasherBusy:
+            return hasher_busy('auth/register.html')
         except Exception as e:
             db.session.rollback()
             flash('An error occurred during registration. Please try again.')
-            return redirect(url_for('register'))
+            return redirect(url_for('main.register'))
 
 from functools import wraps
-from flask import jsonify
+from flask import abort, jsonify, make_response, Response, send_file
+from werkzeug.security import safe_join
 
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
+        if current_user() is None:
             return jsonify({'error': 'Unauthorized'}), 401
         return f(*args, **kwargs)
     return decorated_function
 
-@app.route('/dashboard')
+def read_only(f):
+    """Run the view's SELECTs on the read-only connection pool (routing.py).
+
+    For views that never write; a client that wrote in the last
+    READ_YOUR_WRITES_SECONDS is served from the primary instead.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        routing.use_replica(db.session)
+        return f(*args, **kwargs)
+    return decorated_function
+
+@bp.route('/dashboard')
+@read_only
 def dashboard():
-    if 'user_id' not in session:
-        return redirect(url_for('login'))
-    
     try:
-        user = User.query.get(session['user_id'])
+        user = current_user()
         if not user:
-            session.pop('user_id', None)
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
         
-        # Get active alarms count
-        active_alarms = 0
+        stats = {
+            'active_alarms': 0,
+            'today_sessions': 0,
+            'active_books': 0,
+            'today_study_time': 0
+        }
         try:
-            active_alarms = Alarm.query.filter_by(
-                user_id=session['user_id'],
-                is_active=True
-            ).count()
-        except Exception as e:
-            print(f"Error getting alarms: {e}")
-        
-        # Get today's study sessions
-        today_sessions = 0
-        try:
-            today = datetime.now()
-            today_sessions = StudySession.query.filter(
-                StudySession.user_id == session['user_id'],
-                StudySession.start_time >= today.replace(hour=0, minute=0, second=0),
-                StudySession.start_time <= today.replace(hour=23, minute=59, second=59)
-            ).count()
-        except Exception as e:
-            print(f"Error getting sessions: {e}")
-        
-        # Get active books
-        active_books = 0
-        try:
-            active_books = Book.query.filter(
-                Book.reading_progress > 0,
-                Book.reading_progress < 100
-            ).count()
-        except Exception as e:
-            print(f"Error getting books: {e}")
-        
-        # Calculate total study time today
-        today_study_time = 0
-        try:
-            result = StudySession.query.with_entities(
-                db.func.sum(StudySession.duration)
-            ).filter(
-                StudySession.user_id == session['user_id'],
-                StudySession.start_time >= today.replace(hour=0, minute=0, second=0),
-                StudySession.start_time <= today.replace(hour=23, minute=59, second=59),
-                StudySession.status == 'completed'
-            ).scalar()
-            today_study_time = result if result is not None else 0
-        except Exception as e:
-            print(f"Error getting study time: {e}")
+            stats = get_dashboard_stats(user.id)
+        except Exception:
+            current_app.logger.exception('Error getting dashboard stats')
+            db.session.rollback()
         
-        return render_template('dashboard.html',
-                             user=user,
-                             active_alarms=active_alarms,
-                             today_sessions=today_sessions,
-                             active_books=active_books,
-                             today_study_time=today_study_time)
+        return render_template('dashboard.html', user=user, **stats)
                              
-    except Exception as e:
-        print(f"Dashboard error: {e}")
+    except Exception:
+        current_app.logger.exception('Dashboard error')
         db.session.rollback()
         flash("An error occurred while loading the dashboard. Please try again.", "error")
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
+
+@bp.route('/api/dashboard/stats')
+@login_required
+@read_only
+def get_dashboard_stats_api():
+    return jsonify({'data': get_dashboard_stats(session['user_id'])})
+
+STATS_GRANULARITIES = ('day', 'week', 'month')
+STATS_MAX_DAYS = 3660
+
+def _period_start(day, granularity):
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+@bp.route('/api/stats')
+@login_required
+@read_only
+def get_study_stats():
+    """Completed study time over a date range, from the daily rollups."""
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in STATS_GRANULARITIES:
+        return jsonify({'error': f"granularity must be one of {', '.join(STATS_GRANULARITIES)}"}), 400
+    try:
+        end = (datetime.strptime(request.args['to'], '%Y-%m-%d').date() if request.args.get('to')
+               else datetime.now().date())
+        start = (datetime.strptime(request.args['from'], '%Y-%m-%d').date() if request.args.get('from')
+                 else end - timedelta(days=29))
+    except ValueError:
+        return jsonify({'error': 'from and to must be YYYY-MM-DD'}), 400
+    if start > end or (end - start).days >= STATS_MAX_DAYS:
+        return jsonify({'error': f'from must be before to, at most {STATS_MAX_DAYS} days apart'}), 400
+
+    in_range = db.and_(StudyRollup.user_id == session['user_id'],
+                       StudyRollup.day >= start, StudyRollup.day <= end)
+
+    # At most one 'total' row per day; weeks and months are summed here
+    periods = {}
+    for day, minutes, sessions in db.session.execute(
+            db.select(StudyRollup.day, StudyRollup.minutes, StudyRollup.sessions)
+            .where(in_range, StudyRollup.kind == 'total').order_by(StudyRollup.day)):
+        period = periods.setdefault(_period_start(day, granularity), [0, 0])
+        period[0] += minutes
+        period[1] += sessions
+
+    breakdown = {'subject': [], 'book': []}
+    for kind, key, minutes, sessions in db.session.execute(
+            db.select(StudyRollup.kind, StudyRollup.key, db.func.sum(StudyRollup.minutes),
+                      db.func.sum(StudyRollup.sessions))
+            .where(in_range, StudyRollup.kind.in_(breakdown))
+            .group_by(StudyRollup.kind, StudyRollup.key)
+            .order_by(db.func.sum(StudyRollup.minutes).desc())):
+        if sessions:
+            breakdown[kind].append({'subject' if kind == 'subject' else 'book_id':
+                                    key if kind == 'subject' else int(key),
+                                    'minutes': minutes, 'sessions': sessions})
 
-@app.route('/clock')
+    return jsonify({
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'granularity': granularity,
+        'data': [{'period': period.isoformat(), 'minutes': minutes, 'sessions': sessions}
+                 for period, (minutes, sessions) in periods.items() if sessions],
+        'subjects': breakdown['subject'],
+        'books': breakdown['book']
+    })
+
+@bp.route('/clock')
 def clock():
-    if 'user_id' not in session:
-        return redirect(url_for('login'))
+    if current_user() is None:
+        return redirect(url_for('main.login'))
     return render_template('clock.html')
 
-@app.route('/alarm')
+@bp.route('/alarm')
 def alarm():
-    if 'user_id' not in session:
-        return redirect(url_for('login'))
+    if current_user() is None:
+        return redirect(url_for('main.login'))
     return render_template('alarm-clock.html')
 
-@app.route('/schedule')
+@bp.route('/schedule')
 def schedule():
-    if 'user_id' not in session:
-        return redirect(url_for('login'))
+    if current_user() is None:
+        return redirect(url_for('main.login'))
     return render_template('schedule.html')
 
-# @app.route('/start')
-@app.route('/stop-watch')
+CALENDAR_MAX_DAYS = 92
+
+def _load_calendar_weeks(user_id, weeks):
+    # One query per table covers every missing week
+    first = datetime.combine(min(weeks), datetime.min.time())
+    last = datetime.combine(max(weeks), datetime.min.time()) + timedelta(days=7)
+    alarms = db.session.execute(
+        db.select(Alarm.id, Alarm.name, Alarm.alarm_time, Alarm.repeat_type, Alarm.sound_type,
+                  Alarm.created_at)
+        .where(Alarm.user_id == user_id, Alarm.is_active == True, Alarm.deleted_at.is_(None))
+    ).all()
+    def in_range(model):
+        return db.and_(model.user_id == user_id, model.deleted_at.is_(None),
+                       model.start_time >= first, model.start_time < last)
+
+    columns = ('id', 'subject', 'start_time', 'duration', 'status')
+    if first < archive.horizon():
+        query = archive.session_union(*columns, where=in_range)
+    else:
+        query = db.select(*(getattr(StudySession, column) for column in columns)).where(in_range(StudySession))
+    sessions = db.session.execute(query).all()
+
+    by_week = {week: [] for week in weeks}
+    for study_session in sessions:
+        week = planner.week_start(study_session.start_time.date())
+        if week in by_week:
+            by_week[week].append(study_session)
+    now = datetime.now()
+    return {week: planner.week_items(week, alarms, by_week[week], now) for week in weeks}
+
+@bp.route('/api/schedule/calendar')
+@login_required
+@read_only
+def get_schedule_calendar():
+    """Alarm occurrences and study sessions between two dates, in time order."""
+    try:
+        start = (datetime.strptime(request.args['from'], '%Y-%m-%d').date() if request.args.get('from')
+                 else planner.week_start(datetime.now().date()))
+        end = (datetime.strptime(request.args['to'], '%Y-%m-%d').date() if request.args.get('to')
+               else start + timedelta(days=6))
+    except ValueError:
+        return jsonify({'error': 'from and to must be YYYY-MM-DD'}), 400
+    if start > end or (end - start).days >= CALENDAR_MAX_DAYS:
+        return jsonify({'error': f'from must be before to, at most {CALENDAR_MAX_DAYS} days apart'}), 400
+
+    user_id = session['user_id']
+    first_week = planner.week_start(start)
+    weeks = [first_week + timedelta(days=7 * i) for i in range((end - first_week).days // 7 + 1)]
+    cached = calendar_cache.get_or_load_many(
+        user_id, weeks, lambda missing: _load_calendar_weeks(user_id, missing))
+
+    range_start = datetime.combine(start, datetime.min.time())
+    range_end = datetime.combine(end, datetime.min.time()) + timedelta(days=1)
+    items = [item for week in weeks for item in cached[week]
+             if range_start <= item['start'] < range_end]
+    items = planner.sweep(items)
+    return jsonify({
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'items': items,
+        'overlaps': sum(1 for item in items if item.get('overlaps')),
+        'short_breaks': sum(1 for item in items if item.get('short'))
+    })
+
+# @bp.route('/start')
+@bp.route('/stop-watch')
 def stop_watch():
-    if 'user_id' not in session:
-        return redirect(url_for('login'))
+    if current_user() is None:
+        return redirect(url_for('main.login'))
     return render_template("stop-watch.html")
 
     # Get active alarms
@@ -247,183 +732,850 @@ def stop_watch():
                          current_time=now.strftime("%I:%M:%S %p"),
                          current_date=now.strftime("%B %d, %Y"))
 
-@app.route('/api/user/info')
+@bp.route('/api/user/info')
 @login_required
 def get_user_info():
-    user = User.query.get(session['user_id'])
+    user = current_user()
     return jsonify({
         'id': user.id,
         'email': user.username,
         'role': 'Admin'  # You can extend User model to include role
     })
 
-@app.route('/api/alarms', methods=['GET'])
+@bp.route('/api/events')
 @login_required
-def get_alarms():
-    alarms = Alarm.query.filter_by(user_id=session['user_id']).all()
-    return jsonify({
-        'data': [{
-            'id': alarm.id,
-            'name': alarm.name,
-            'alarm_time': alarm.alarm_time,
-            'repeat_type': alarm.repeat_type,
-            'sound_type': alarm.sound_type,
-            'volume': alarm.volume,
-            'is_active': alarm.is_active
-        } for alarm in alarms]
+def stream_events():
+    try:
+        subscription = event_broker.subscribe(session['user_id'])
+    except StreamsFull:
+        # EventSource gives up on a 503; the page polls and retries later
+        response = jsonify({'error': 'Too many open event streams'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '60'
+        return response
+    heartbeat = current_app.config['SSE_HEARTBEAT_SECONDS']
+
+    def generate():
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                message = subscription.get(timeout=heartbeat)
+                yield message if message is not None else ': keep-alive\n\n'
+        finally:
+            event_broker.unsubscribe(subscription)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
     })
 
-@app.route('/api/alarms', methods=['POST'])
+def serialize_alarm(alarm):
+    return {
+        'id': alarm.id,
+        'name': alarm.name,
+        'alarm_time': alarm.alarm_time,
+        'repeat_type': alarm.repeat_type,
+        'sound_type': alarm.sound_type,
+        'volume': alarm.volume,
+        'is_active': alarm.is_active
+    }
+
+def sync_response(model, serialize, order_by, archive_model=None):
+    """List the user's rows of `model`, or only those changed after `?since=`.
+
+    `?since=` is a token from an earlier response's `next_since`, holding
+    the latest change number (changes.py) that response covered. Answers
+    304 when the client's ETag still matches: the ETag is derived from a
+    COUNT/MAX(change_seq) over the user's rows (tombstones included), so
+    an unchanged list is never loaded or serialized. With
+    `?include_archived=1`, rows moved to `archive_model` are listed too.
+    """
+    user_id = session['user_id']
+    models = [model]
+    if archive_model is not None and request.args.get('include_archived') in ('1', 'true'):
+        models.append(archive_model)
+    since = None
+    if 'since' in request.args:
+        token = decode_cursor(request.args['since'])
+        try:
+            since = int(token['seq'])
+        except (TypeError, KeyError, ValueError):
+            return jsonify({'error': 'Invalid since token'}), 400
+
+    versions = [db.session.execute(
+        db.select(db.func.count(table.id), db.func.max(table.change_seq)).where(
+            table.user_id == user_id
+        )
+    ).one() for table in models]
+    last_change = max((version[1] for version in versions if version[1]), default=None)
+    etag = hashlib.sha1(
+        f"{model.__tablename__}:{user_id}:{[tuple(version) for version in versions]}:{since}".encode()
+    ).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        rows = []
+        for table in models:
+            query = table.query.filter_by(user_id=user_id)
+            if since is not None:
+                # Changes committed after the versions above come next time
+                query = query.filter(table.change_seq > since, table.change_seq <= (last_change or since))
+            else:
+                query = query.filter(table.deleted_at.is_(None))
+            rows += query.order_by(getattr(table, order_by.key)).all()
+        if len(models) > 1:
+            rows.sort(key=lambda row: getattr(row, order_by.key))
+        response = jsonify({
+            'data': [serialize(row) for row in rows if row.deleted_at is None],
+            'deleted': [row.id for row in rows if row.deleted_at is not None],
+            'next_since': encode_cursor({'seq': last_change}) if last_change else None
+        })
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@bp.route('/api/alarms', methods=['GET'])
+@login_required
+@read_only
+def get_alarms():
+    return sync_response(Alarm, serialize_alarm, Alarm.id)
+
+@bp.route('/api/alarms', methods=['POST'])
 @login_required
 def create_alarm():
-    data = request.get_json()
-    new_alarm = Alarm(
-        user_id=session['user_id'],
-        name=data['name'],
-        alarm_time=data['alarm_time'],
-        repeat_type=data.get('repeat_type', 'once'),
-        sound_type=data.get('sound_type', 'bell'),
-        volume=data.get('volume', 80),
-        is_active=True
-    )
+    values, error = validate_alarm(request.get_json(silent=True))
+    if error:
+        return jsonify({'error': error}), 400
+    new_alarm = Alarm(user_id=session['user_id'], **values)
     db.session.add(new_alarm)
     db.session.commit()
+    schedule_alarm(new_alarm)
+    stats_changed(new_alarm.user_id)
     return jsonify({
         'message': 'Alarm created successfully',
         'id': new_alarm.id
     })
 
-@app.route('/api/alarms/<int:alarm_id>', methods=['PUT'])
+@bp.route('/api/alarms/<int:alarm_id>', methods=['PUT'])
 @login_required
 def update_alarm(alarm_id):
-    alarm = Alarm.query.filter_by(id=alarm_id, user_id=session['user_id']).first_or_404()
-    data = request.get_json()
-    
-    for field in ['name', 'alarm_time', 'repeat_type', 'sound_type', 'volume', 'is_active']:
-        if field in data:
-            setattr(alarm, field, data[field])
-    
+    alarm = Alarm.query.filter_by(id=alarm_id, user_id=session['user_id'], deleted_at=None).first_or_404()
+    values, error = validate_alarm(request.get_json(silent=True), partial=True)
+    if error:
+        return jsonify({'error': error}), 400
+    for field, value in values.items():
+        setattr(alarm, field, value)
     db.session.commit()
+    schedule_alarm(alarm)
+    stats_changed(alarm.user_id)
     return jsonify({'message': 'Alarm updated successfully'})
 
-@app.route('/api/alarms/<int:alarm_id>', methods=['DELETE'])
+@bp.route('/api/alarms/<int:alarm_id>', methods=['DELETE'])
 @login_required
 def delete_alarm(alarm_id):
-    alarm = Alarm.query.filter_by(id=alarm_id, user_id=session['user_id']).first_or_404()
-    db.session.delete(alarm)
+    alarm = Alarm.query.filter_by(id=alarm_id, user_id=session['user_id'], deleted_at=None).first_or_404()
+    alarm.deleted_at = datetime.utcnow()
     db.session.commit()
+    alarm_scheduler.remove(alarm_id)
+    stats_changed(session['user_id'])
     return jsonify({'message': 'Alarm deleted successfully'})
 
-@app.route('/api/study-sessions', methods=['GET'])
+@bp.route('/api/alarms/next', methods=['GET'])
 @login_required
-def get_study_sessions():
-    sessions = StudySession.query.filter_by(user_id=session['user_id']).order_by(StudySession.start_time).all()
+def get_next_alarm():
+    entry = alarm_scheduler.next_for_user(session['user_id'])
+    if entry is None:
+        return jsonify({'data': None})
     return jsonify({
-        'data': [{
-            'id': session.id,
-            'subject': session.subject,
-            'start_time': session.start_time.strftime("%Y-%m-%d %H:%M:%S"),
-            'duration': session.duration,
-            'status': session.status,
-            'notes': session.notes
-        } for session in sessions]
+        'data': {
+            'id': entry.alarm_id,
+            'alarm_time': entry.alarm_time,
+            'repeat_type': entry.repeat_type,
+            'fire_at': entry.fire_at.strftime("%Y-%m-%d %H:%M:%S"),
+            'seconds_until': max(0, int((entry.fire_at - datetime.now()).total_seconds()))
+        }
+    })
+
+# Batch endpoints: validate every item first, then write in one transaction
+BATCH_MAX_ITEMS = 500
+ALARM_REPEAT_TYPES = ('once', 'daily', 'weekdays', 'weekends')
+ALARM_SOUND_TYPES = ('bell', 'chime', 'digital', 'voice')
+STUDY_SESSION_STATUSES = ('upcoming', 'active', 'completed')
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def validate_alarm(data, partial=False):
+    """Return (values, error) for one alarm payload."""
+    if not isinstance(data, dict):
+        return None, 'Expected an object'
+    if not partial:
+        data = {'repeat_type': 'once', 'sound_type': 'bell', 'volume': 80, 'is_active': True, **data}
+        for field in ('name', 'alarm_time'):
+            if field not in data:
+                return None, f'{field} is required'
+
+    values = {}
+    if 'name' in data:
+        if not isinstance(data['name'], str) or not data['name'].strip() or len(data['name']) > 100:
+            return None, 'name must be 1-100 characters'
+        values['name'] = data['name']
+    if 'alarm_time' in data:
+        try:
+            valid = len(data['alarm_time']) == 5 and datetime.strptime(data['alarm_time'], "%H:%M")
+        except (TypeError, ValueError):
+            valid = False
+        if not valid:
+            return None, 'alarm_time must be HH:MM'
+        values['alarm_time'] = data['alarm_time']
+    if 'repeat_type' in data:
+        if data['repeat_type'] not in ALARM_REPEAT_TYPES:
+            return None, f"repeat_type must be one of {', '.join(ALARM_REPEAT_TYPES)}"
+        values['repeat_type'] = data['repeat_type']
+    if 'sound_type' in data:
+        if data['sound_type'] not in ALARM_SOUND_TYPES:
+            return None, f"sound_type must be one of {', '.join(ALARM_SOUND_TYPES)}"
+        values['sound_type'] = data['sound_type']
+    if 'volume' in data:
+        if not _is_int(data['volume']) or not 0 <= data['volume'] <= 100:
+            return None, 'volume must be an integer from 0 to 100'
+        values['volume'] = data['volume']
+    if 'is_active' in data:
+        if data['is_active'] not in (True, False, 0, 1):
+            return None, 'is_active must be a boolean'
+        values['is_active'] = bool(data['is_active'])
+    return values, None
+
+def validate_study_session(data, partial=False):
+    """Return (values, error) for one study-session payload."""
+    if not isinstance(data, dict):
+        return None, 'Expected an object'
+    if not partial:
+        data = {'status': 'upcoming', 'notes': '', **data}
+        for field in ('subject', 'start_time', 'duration'):
+            if field not in data:
+                return None, f'{field} is required'
+
+    values = {}
+    if 'subject' in data:
+        if not isinstance(data['subject'], str) or not data['subject'].strip() or len(data['subject']) > 100:
+            return None, 'subject must be 1-100 characters'
+        values['subject'] = data['subject']
+    if 'start_time' in data:
+        try:
+            values['start_time'] = datetime.strptime(data['start_time'], "%Y-%m-%d %H:%M:%S")
+        except (TypeError, ValueError):
+            return None, 'start_time must be YYYY-MM-DD HH:MM:SS'
+    if 'duration' in data:
+        if not _is_int(data['duration']) or data['duration'] <= 0:
+            return None, 'duration must be a positive number of minutes'
+        values['duration'] = data['duration']
+    if 'status' in data:
+        if data['status'] not in STUDY_SESSION_STATUSES:
+            return None, f"status must be one of {', '.join(STUDY_SESSION_STATUSES)}"
+        values['status'] = data['status']
+    if 'notes' in data:
+        if data['notes'] is not None and not isinstance(data['notes'], str):
+            return None, 'notes must be a string'
+        values['notes'] = data['notes']
+    if 'book_id' in data:
+        if data['book_id'] is not None and not _is_int(data['book_id']):
+            return None, 'book_id must be an integer'
+        values['book_id'] = data['book_id']
+    return values, None
+
+def read_batch():
+    """Return (items, error_response) for a batch request body."""
+    items = request.get_json(silent=True)
+    if isinstance(items, dict):
+        items = items.get('items')
+    if not isinstance(items, list) or not items:
+        return None, (jsonify({'error': 'Expected a non-empty JSON array of items'}), 400)
+    if len(items) > BATCH_MAX_ITEMS:
+        return None, (jsonify({'error': f'At most {BATCH_MAX_ITEMS} items per batch'}), 413)
+    return items, None
+
+def validate_batch(items, validate, partial=False, require_id=False):
+    """Validate every item; return (values list, errors by index)."""
+    values, errors = [], {}
+    for index, item in enumerate(items):
+        if require_id and not (isinstance(item, dict) and _is_int(item.get('id'))):
+            errors[index] = 'id is required'
+            continue
+        item_values, error = validate(item, partial)
+        if error:
+            errors[index] = error
+            continue
+        if require_id:
+            item_values['id'] = item['id']
+        values.append(item_values)
+    if require_id and not errors:
+        seen = set()
+        for index, item in enumerate(items):
+            if item['id'] in seen:
+                errors[index] = 'duplicate id'
+            seen.add(item['id'])
+    return values, errors
+
+def batch_ids(items):
+    """Ids from a DELETE batch, given either as numbers or as {'id': n}."""
+    ids, errors = [], {}
+    for index, item in enumerate(items):
+        item_id = item.get('id') if isinstance(item, dict) else item
+        if not _is_int(item_id):
+            errors[index] = 'id is required'
+        elif item_id in ids:
+            errors[index] = 'duplicate id'
+        else:
+            ids.append(item_id)
+    return ids, errors
+
+def batch_error_response(errors, size):
+    return jsonify({
+        'error': 'Validation failed; nothing was written',
+        'results': [{'index': index, 'error': errors[index]} if index in errors
+                    else {'index': index, 'status': 'ok'} for index in range(size)]
+    }), 400
+
+def missing_id_errors(model, ids):
+    """Errors for ids that are not live rows owned by the current user."""
+    owned = set(db.session.execute(
+        db.select(model.id).where(
+            model.id.in_(ids),
+            model.user_id == session['user_id'],
+            model.deleted_at.is_(None)
+        )
+    ).scalars())
+    return {index: 'not found' for index, item_id in enumerate(ids) if item_id not in owned}
+
+def batch_result(ids, status):
+    return jsonify({'results': [
+        {'index': index, 'id': item_id, 'status': status} for index, item_id in enumerate(ids)
+    ]})
+
+@bp.route('/api/alarms/batch', methods=['POST'])
+@login_required
+def create_alarms_batch():
+    items, error_response = read_batch()
+    if error_response:
+        return error_response
+    values, errors = validate_batch(items, validate_alarm)
+    if errors:
+        return batch_error_response(errors, len(items))
+
+    user_id = session['user_id']
+    for row in values:
+        row['user_id'] = user_id
+    ids = list(db.session.execute(
+        db.insert(Alarm).returning(Alarm.id, sort_by_parameter_order=True), values
+    ).scalars())
+    db.session.commit()
+
+    for alarm_id, row in zip(ids, values):
+        alarm_scheduler.schedule(alarm_id, user_id, row['alarm_time'], row['repeat_type'], row['is_active'])
+    stats_changed(user_id)
+    return batch_result(ids, 'created')
+
+@bp.route('/api/alarms/batch', methods=['PATCH'])
+@login_required
+def update_alarms_batch():
+    items, error_response = read_batch()
+    if error_response:
+        return error_response
+    values, errors = validate_batch(items, validate_alarm, partial=True, require_id=True)
+    if not errors:
+        errors = missing_id_errors(Alarm, [row['id'] for row in values])
+    if errors:
+        return batch_error_response(errors, len(items))
+
+    now = datetime.utcnow()
+    for row in values:
+        row['updated_at'] = now
+    db.session.execute(db.update(Alarm), values)
+    db.session.commit()
+
+    ids = [row['id'] for row in values]
+    for alarm in Alarm.query.filter(Alarm.id.in_(ids)):
+        schedule_alarm(alarm)
+    stats_changed(session['user_id'])
+    return batch_result(ids, 'updated')
+
+@bp.route('/api/alarms/batch', methods=['DELETE'])
+@login_required
+def delete_alarms_batch():
+    items, error_response = read_batch()
+    if error_response:
+        return error_response
+    ids, errors = batch_ids(items)
+    if not errors:
+        errors = missing_id_errors(Alarm, ids)
+    if errors:
+        return batch_error_response(errors, len(items))
+
+    now = datetime.utcnow()
+    db.session.execute(
+        db.update(Alarm).where(Alarm.id.in_(ids)).values(deleted_at=now, updated_at=now),
+        execution_options={'synchronize_session': False}
+    )
+    db.session.commit()
+
+    for alarm_id in ids:
+        alarm_scheduler.remove(alarm_id)
+    stats_changed(session['user_id'])
+    return batch_result(ids, 'deleted')
+
+# Client-reported alarm events are buffered and inserted in batches, so a
+# burst at the top of the hour costs a few transactions
+ALARM_EVENT_ACTIONS = ('fired', 'snoozed', 'dismissed')
+alarm_event_queue = WriteBehindQueue(AlarmEvent)
+
+def validate_alarm_event(data, partial=False):
+    """Return (values, error) for one alarm event payload."""
+    if not isinstance(data, dict):
+        return None, 'Expected an object'
+    if not _is_int(data.get('alarm_id')):
+        return None, 'alarm_id is required'
+    if data.get('action') not in ALARM_EVENT_ACTIONS:
+        return None, f"action must be one of {', '.join(ALARM_EVENT_ACTIONS)}"
+    occurred_at = datetime.utcnow()
+    if data.get('occurred_at') is not None:
+        try:
+            occurred_at = datetime.fromisoformat(data['occurred_at'])
+        except (TypeError, ValueError):
+            return None, 'occurred_at must be an ISO 8601 timestamp'
+        # Stored as naive UTC; a timestamp without an offset is taken as UTC
+        if occurred_at.tzinfo is not None:
+            occurred_at = occurred_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return {'alarm_id': data['alarm_id'], 'action': data['action'], 'occurred_at': occurred_at}, None
+
+@bp.route('/api/alarms/events', methods=['POST'])
+@login_required
+def log_alarm_events():
+    data = request.get_json(silent=True)
+    if isinstance(data, dict) and 'items' not in data:
+        items = [data]
+    else:
+        items, error_response = read_batch()
+        if error_response:
+            return error_response
+    user_id = session['user_id']
+    values, errors = validate_batch(items, validate_alarm_event)
+    if not errors:
+        # Events may refer to alarms deleted since they rang
+        owned = set(db.session.execute(
+            db.select(Alarm.id).where(Alarm.id.in_({row['alarm_id'] for row in values}),
+                                      Alarm.user_id == user_id)
+        ).scalars())
+        errors = {index: 'alarm not found' for index, row in enumerate(values)
+                  if row['alarm_id'] not in owned}
+    if errors:
+        return batch_error_response(errors, len(items))
+
+    now = datetime.utcnow()
+    for row in values:
+        row['user_id'] = user_id
+        row['created_at'] = now
+    if not alarm_event_queue.put(values):
+        return jsonify({'error': 'Too many pending events, retry shortly'}), 503, {'Retry-After': '1'}
+    return jsonify({'accepted': len(values)}), 202
+
+def serialize_study_session(study_session):
+    return {
+        'id': study_session.id,
+        'subject': study_session.subject,
+        'start_time': study_session.start_time.strftime("%Y-%m-%d %H:%M:%S"),
+        'duration': study_session.duration,
+        'status': study_session.status,
+        'notes': study_session.notes
+    }
+
+@bp.route('/api/study-sessions', methods=['GET'])
+@login_required
+@read_only
+def get_study_sessions():
+    return sync_response(StudySession, serialize_study_session, StudySession.start_time,
+                         archive_model=StudySessionArchive)
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_COLUMNS = ('id', 'subject', 'start_time', 'duration', 'status', 'notes', 'book_id')
+
+def _parse_export_bound(value, end):
+    # A bare date as `to` covers that whole day
+    bound = datetime.fromisoformat(value)
+    if end and len(value) == 10:
+        bound += timedelta(days=1)
+    return bound
+
+def _export_batches(user_id, start, end):
+    # Plain column tuples fetched EXPORT_BATCH_SIZE at a time; no ORM objects
+    def where(model):
+        condition = db.and_(model.user_id == user_id, model.deleted_at.is_(None))
+        if start is not None:
+            condition = db.and_(condition, model.start_time >= start)
+        if end is not None:
+            condition = db.and_(condition, model.start_time < end)
+        return condition
+
+    # An export reaching back past the archive horizon includes archived sessions
+    if start is None or start < archive.horizon():
+        query = archive.session_union(*EXPORT_COLUMNS, where=where).order_by('start_time', 'id')
+    else:
+        query = db.select(*(getattr(StudySession, column) for column in EXPORT_COLUMNS)).where(
+            where(StudySession)
+        ).order_by(StudySession.start_time, StudySession.id)
+    result = db.session.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    for rows in result.partitions():
+        yield [(row.id, row.subject, row.start_time.strftime("%Y-%m-%d %H:%M:%S"), row.duration,
+                row.status, row.notes, row.book_id) for row in rows]
+
+@bp.route('/api/study-sessions/export', methods=['GET'])
+@login_required
+@read_only
+def export_study_sessions():
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    try:
+        start = _parse_export_bound(request.args['from'], end=False) if request.args.get('from') else None
+        end = _parse_export_bound(request.args['to'], end=True) if request.args.get('to') else None
+    except ValueError:
+        return jsonify({'error': 'from and to must be YYYY-MM-DD or YYYY-MM-DD HH:MM:SS'}), 400
+
+    batches = _export_batches(session['user_id'], start, end)
+
+    def generate_ndjson():
+        for batch in batches:
+            yield ''.join(json.dumps(dict(zip(EXPORT_COLUMNS, row))) + '\n' for row in batch)
+
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        yield buffer.getvalue()
+        for batch in batches:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(batch)
+            yield buffer.getvalue()
+
+    generate, mimetype = ((generate_csv, 'text/csv') if export_format == 'csv'
+                          else (generate_ndjson, 'application/x-ndjson'))
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename=study-sessions.{export_format}',
+        'X-Accel-Buffering': 'no'
     })
 
-@app.route('/api/study-sessions', methods=['POST'])
+@bp.route('/api/study-sessions', methods=['POST'])
 @login_required
 def create_study_session():
-    data = request.get_json()
-    new_session = StudySession(
-        user_id=session['user_id'],
-        subject=data['subject'],
-        start_time=datetime.strptime(data['start_time'], "%Y-%m-%d %H:%M:%S"),
-        duration=data['duration'],
-        status='upcoming',
-        notes=data.get('notes', '')
-    )
+    values, error = validate_study_session(request.get_json(silent=True))
+    if not error and unknown_book_errors([values]):
+        error = 'book not found'
+    if error:
+        return jsonify({'error': error}), 400
+    new_session = StudySession(user_id=session['user_id'], **values)
     db.session.add(new_session)
     db.session.commit()
+    stats_changed(new_session.user_id)
+    session_status_worker.wake(new_session.start_time)
     return jsonify({
         'message': 'Study session created successfully',
         'id': new_session.id
     })
 
-@app.route('/api/study-sessions/<int:session_id>', methods=['PUT'])
+def publish_session_status(study_session, previous_status):
+    if study_session.status == previous_status:
+        return
+    event = {'active': 'session_started', 'completed': 'session_ended'}.get(study_session.status)
+    if event:
+        event_broker.publish(study_session.user_id, event, {
+            'id': study_session.id,
+            'subject': study_session.subject,
+            'status': study_session.status
+        })
+
+@bp.route('/api/study-sessions/<int:session_id>', methods=['PUT'])
 @login_required
 def update_study_session(session_id):
     study_session = StudySession.query.filter_by(
         id=session_id, 
-        user_id=session['user_id']
+        user_id=session['user_id'],
+        deleted_at=None
     ).first_or_404()
     
-    data = request.get_json()
-    if 'subject' in data:
-        study_session.subject = data['subject']
-    if 'start_time' in data:
-        study_session.start_time = datetime.strptime(data['start_time'], "%Y-%m-%d %H:%M:%S")
-    if 'duration' in data:
-        study_session.duration = data['duration']
-    if 'status' in data:
-        study_session.status = data['status']
-    if 'notes' in data:
-        study_session.notes = data['notes']
-    
+    values, error = validate_study_session(request.get_json(silent=True), partial=True)
+    if not error and unknown_book_errors([values]):
+        error = 'book not found'
+    if error:
+        return jsonify({'error': error}), 400
+    previous_status = study_session.status
+    for field, value in values.items():
+        setattr(study_session, field, value)
     db.session.commit()
+    publish_session_status(study_session, previous_status)
+    stats_changed(study_session.user_id)
+    session_status_worker.wake(study_session.start_time)
     return jsonify({'message': 'Study session updated successfully'})
 
-@app.route('/api/study-sessions/<int:session_id>', methods=['DELETE'])
+def unknown_book_errors(values):
+    book_ids = {row['book_id'] for row in values if row.get('book_id') is not None}
+    if not book_ids:
+        return {}
+    known = set(db.session.execute(db.select(Book.id).where(Book.id.in_(book_ids))).scalars())
+    return {index: 'book not found' for index, row in enumerate(values)
+            if row.get('book_id') is not None and row['book_id'] not in known}
+
+@bp.route('/api/study-sessions/batch', methods=['POST'])
+@login_required
+def create_study_sessions_batch():
+    items, error_response = read_batch()
+    if error_response:
+        return error_response
+    values, errors = validate_batch(items, validate_study_session)
+    if not errors:
+        errors = unknown_book_errors(values)
+    if errors:
+        return batch_error_response(errors, len(items))
+
+    user_id = session['user_id']
+    for row in values:
+        row['user_id'] = user_id
+    ids = list(db.session.execute(
+        db.insert(StudySession).returning(StudySession.id, sort_by_parameter_order=True), values
+    ).scalars())
+    rollups.apply_changes(db.session.connection(), [(None, row) for row in values])
+    note_catalog_sessions(row.get('book_id') for row in values)
+    db.session.commit()
+
+    stats_changed(user_id)
+    session_status_worker.wake(min(row['start_time'] for row in values))
+    return batch_result(ids, 'created')
+
+@bp.route('/api/study-sessions/batch', methods=['PATCH'])
+@login_required
+def update_study_sessions_batch():
+    items, error_response = read_batch()
+    if error_response:
+        return error_response
+    values, errors = validate_batch(items, validate_study_session, partial=True, require_id=True)
+    if not errors:
+        errors = missing_id_errors(StudySession, [row['id'] for row in values])
+    if not errors:
+        errors = unknown_book_errors(values)
+    if errors:
+        return batch_error_response(errors, len(items))
+
+    ids = [row['id'] for row in values]
+    before = rollups.locked_states(db.session, ids)
+    now = datetime.utcnow()
+    for row in values:
+        row['updated_at'] = now
+    db.session.execute(db.update(StudySession), values)
+    after = [{**before[row['id']], **row} for row in values]
+    rollups.apply_changes(db.session.connection(),
+                          [(before[state['id']], state) for state in after])
+    note_catalog_sessions([state['book_id'] for state in before.values()] + [state['book_id'] for state in after])
+    db.session.commit()
+    session_status_worker.wake(min(state['start_time'] for state in after))
+
+    for study_session in StudySession.query.filter(StudySession.id.in_(ids)):
+        publish_session_status(study_session, before[study_session.id]['status'])
+    stats_changed(session['user_id'])
+    return batch_result(ids, 'updated')
+
+@bp.route('/api/study-sessions/batch', methods=['DELETE'])
+@login_required
+def delete_study_sessions_batch():
+    items, error_response = read_batch()
+    if error_response:
+        return error_response
+    ids, errors = batch_ids(items)
+    if not errors:
+        errors = missing_id_errors(StudySession, ids)
+    if errors:
+        return batch_error_response(errors, len(items))
+
+    before = rollups.locked_states(db.session, ids)
+    now = datetime.utcnow()
+    db.session.execute(
+        db.update(StudySession).where(StudySession.id.in_(ids)).values(deleted_at=now, updated_at=now),
+        execution_options={'synchronize_session': False}
+    )
+    rollups.apply_changes(db.session.connection(), [(state, None) for state in before.values()])
+    note_catalog_sessions(state['book_id'] for state in before.values())
+    db.session.commit()
+
+    stats_changed(session['user_id'])
+    return batch_result(ids, 'deleted')
+
+@bp.route('/api/study-sessions/<int:session_id>', methods=['DELETE'])
 @login_required
 def delete_study_session(session_id):
     study_session = StudySession.query.filter_by(
         id=session_id, 
-        user_id=session['user_id']
+        user_id=session['user_id'],
+        deleted_at=None
     ).first_or_404()
-    db.session.delete(study_session)
+    study_session.deleted_at = datetime.utcnow()
     db.session.commit()
+    stats_changed(session['user_id'])
     return jsonify({'message': 'Study session deleted successfully'})
 
 # Book routes
-@app.route('/book-view')
+BOOK_FIELDS = ('id', 'title', 'author', 'category', 'description', 'cover_image', 'status',
+               'total_pages', 'current_page', 'reading_progress', 'study_sessions')
+BOOK_PAGE_SIZE = 50
+BOOK_PAGE_MAX = 200
+
+def book_session_count():
+    # Correlated COUNTs per book, answered from the book_start indexes of
+    # both session tables inside the same statement instead of one
+    # lazy-load query per book
+    hot, archived = (db.select(db.func.count(model.id)).where(
+        model.book_id == Book.id,
+        model.deleted_at.is_(None)
+    ).correlate(Book).scalar_subquery() for model in (StudySession, StudySessionArchive))
+    return (hot + archived).label('study_sessions')
+
+def encode_cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        return None
+
+def catalog_response(key, build):
+    """Serve catalog JSON from `catalog_cache`, or 304 when the ETag matches.
+
+    The ETag is a hash of the cached body, so it is the same in every
+    worker process and only changes when the payload does.
+    """
+    def load():
+        body = current_app.json.dumps(build()).encode()
+        return body, hashlib.sha1(body).hexdigest()
+
+    body, etag = catalog_cache.get_or_load(key, load)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def _load_book_view_catalog():
+    rows = db.session.execute(
+        db.select(Book, book_session_count()).order_by(Book.id)
+    ).all()
+    books = [{field: getattr(book, field) for field in BOOK_FIELDS if field != 'study_sessions'}
+             for book, _ in rows]
+    session_counts = {book.id: count for book, count in rows}
+    etag = hashlib.sha1(json.dumps([books, sorted(session_counts.items())], default=str).encode()).hexdigest()
+    return books, session_counts, etag
+
+@bp.route('/book-view')
 @login_required
+@read_only
 def book_view():
-    books = Book.query.all()
+    books, session_counts, catalog_etag = catalog_cache.get_or_load(('book_view',), _load_book_view_catalog)
     active_sessions = StudySession.query.filter_by(
         user_id=session['user_id'],
-        status='active'
+        status='active',
+        deleted_at=None
     ).all()
-    return render_template('book-view.html', 
-                         books=books,
-                         active_sessions=active_sessions)
 
-@app.route('/api/books', methods=['GET'])
+    # The page is the shared catalog plus this user's active sessions
+    etag = hashlib.sha1(
+        f"{catalog_etag}:{[(s.id, s.updated_at) for s in active_sessions]}".encode()
+    ).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = make_response(render_template('book-view.html',
+                                                 books=books,
+                                                 session_counts=session_counts,
+                                                 active_sessions=active_sessions))
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def _load_books_page(fields, limit, after_id):
+    # Only the requested columns are selected; id is always needed for the cursor
+    columns = [Book.id] + [getattr(Book, field) for field in fields
+                           if field not in ('id', 'study_sessions')]
+    if 'study_sessions' in fields:
+        columns.append(book_session_count())
+
+    rows = db.session.execute(
+        db.select(*columns).where(Book.id > after_id).order_by(Book.id).limit(limit + 1)
+    ).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor({'after': rows[-1].id})
+
+    return {
+        'data': [{field: getattr(row, field) for field in fields} for row in rows],
+        'next_cursor': next_cursor
+    }
+
+@bp.route('/api/books', methods=['GET'])
 @login_required
+@read_only
 def get_books():
-    books = Book.query.all()
-    return jsonify({
-        'data': [{
-            'id': book.id,
-            'title': book.title,
-            'author': book.author,
-            'category': book.category,
-            'description': book.description,
-            'cover_image': book.cover_image,
-            'status': book.status,
-            'total_pages': book.total_pages,
-            'current_page': book.current_page,
-            'reading_progress': book.reading_progress,
-            'study_sessions': len(book.study_sessions)
-        } for book in books]
-    })
+    fields = BOOK_FIELDS
+    if request.args.get('fields'):
+        fields = tuple(field.strip() for field in request.args['fields'].split(',') if field.strip())
+        unknown = [field for field in fields if field not in BOOK_FIELDS]
+        if unknown:
+            return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+
+    limit = request.args.get('limit', BOOK_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, BOOK_PAGE_MAX))
+
+    after_id = 0
+    if request.args.get('cursor'):
+        cursor = decode_cursor(request.args['cursor'])
+        if not isinstance(cursor, dict) or not isinstance(cursor.get('after'), int):
+            return jsonify({'error': 'Invalid cursor'}), 400
+        after_id = cursor['after']
+
+    return catalog_response(('books', fields, limit, after_id),
+                            lambda: _load_books_page(fields, limit, after_id))
 
-@app.route('/api/books/<int:book_id>', methods=['GET'])
+BOOK_SEARCH_LIMIT = 10
+BOOK_SEARCH_MAX = 50
+
+@bp.route('/api/books/search', methods=['GET'])
 @login_required
-def get_book(book_id):
+@read_only
+def search_books():
+    # Ranked matches from the book_fts index; the last word is a prefix,
+    # so this can back an autocomplete box as the user types
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'q is required'}), 400
+    limit = request.args.get('limit', BOOK_SEARCH_LIMIT, type=int)
+    limit = max(1, min(limit, BOOK_SEARCH_MAX))
+    category = request.args.get('category', '').strip() or None
+
+    results = search.search_books(db.session, query, category=category, limit=limit)
+    return jsonify({'data': results, 'query': query})
+
+def _load_book(book_id):
     book = Book.query.get_or_404(book_id)
-    recent_sessions = StudySession.query.filter_by(
-        book_id=book_id
-    ).order_by(StudySession.start_time.desc()).limit(5).all()
+    # The book's history spans both tables
+    recent_sessions = db.session.execute(
+        archive.session_union('id', 'start_time', 'duration', 'status', where=lambda model: db.and_(
+            model.book_id == book_id,
+            model.deleted_at.is_(None)
+        )).order_by(db.desc('start_time')).limit(5)
+    ).all()
     
-    return jsonify({
+    return {
         'id': book.id,
         'title': book.title,
         'author': book.author,
@@ -440,29 +1592,150 @@ def get_book(book_id):
             'duration': session.duration,
             'status': session.status
         } for session in recent_sessions]
-    })
+    }
 
-@app.route('/api/books/<int:book_id>/progress', methods=['PUT'])
+@bp.route('/api/books/<int:book_id>', methods=['GET'])
+@login_required
+@read_only
+def get_book(book_id):
+    return catalog_response(('book', book_id), lambda: _load_book(book_id))
+
+@bp.route('/api/books/<int:book_id>/progress', methods=['PUT'])
 @login_required
 def update_book_progress(book_id):
     book = Book.query.get_or_404(book_id)
     data = request.get_json()
     
+    was_active = 0 < (book.reading_progress or 0) < 100
     if 'current_page' in data:
         book.current_page = min(data['current_page'], book.total_pages)
         book.reading_progress = (book.current_page / book.total_pages) * 100
         
+    # Committing a book change moves catalog_cache to a new version
     db.session.commit()
+
+    # The active-book counter is shared, so only a change in it touches every user
+    if was_active != (0 < book.reading_progress < 100):
+        dashboard_stats_cache.invalidate_all()
+        event_broker.broadcast('stats_changed')
     return jsonify({
         'message': 'Progress updated successfully',
         'current_page': book.current_page,
         'reading_progress': book.reading_progress
     })
 
-@app.route('/logout')
+# Built CSS/JS bundles (see assets.py). Hashed names never change content,
+# so browsers may keep them for a year without revalidating
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+@bp.app_template_global()
+def asset_url(name):
+    manifest = current_app.extensions.get('asset_manifest')
+    if manifest and name in manifest:
+        return url_for('main.asset', filename=manifest[name])
+    return url_for('main.asset', filename=name)
+
+@bp.route('/assets/<path:filename>')
+def asset(filename):
+    ext = os.path.splitext(filename)[1]
+    if filename in assets.BUNDLES:
+        # Unbuilt bundle names (development): concatenated from the sources
+        response = Response(assets.bundle_source(current_app.static_folder, filename),
+                            mimetype=assets.CONTENT_TYPES[ext])
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    path = safe_join(current_app.static_folder, assets.DIST_DIR, filename)
+    if ext not in assets.CONTENT_TYPES or path is None or not os.path.isfile(path):
+        abort(404)
+    encoding = None
+    for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if request.accept_encodings[candidate] and os.path.isfile(path + suffix):
+            encoding, path = candidate, path + suffix
+            break
+    response = send_file(path, mimetype=assets.CONTENT_TYPES[ext], etag=True)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = f'public, max-age={ASSET_MAX_AGE}, immutable'
+    return response
+
+def metrics_allowed():
+    # remote_addr is the proxy's address unless ProxyFix is configured
+    if request.remote_addr in current_app.config['METRICS_ALLOWED_IPS']:
+        return True
+    token = current_app.config['METRICS_TOKEN']
+    supplied = request.headers.get('Authorization', '')
+    return bool(token) and hmac.compare_digest(supplied.encode(), f'Bearer {token}'.encode())
+
+@bp.route('/metrics')
+def metrics():
+    if not metrics_allowed():
+        abort(404)
+    return Response(request_metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@bp.route('/logout')
 def logout():
-    session.pop('user_id', None)
-    return redirect(url_for('login'))
+    # Deletes the stored session, not just the id in it
+    session.clear()
+    return redirect(url_for('main.login'))
+
+def create_app(config_name=None):
+    app = Flask(__name__, template_folder='template')
+    app.config.from_object(CONFIGS[config_name or os.environ.get('APP_CONFIG', 'development')])
+
+    db.init_app(app)
+    with app.app_context():
+        # WAL journaling, busy timeout and cache pragmas on every connection
+        apply_pragmas(db.engine)
+
+        # Per-endpoint latency and SQL counters behind /metrics
+        request_metrics.slow_query_seconds = app.config['SLOW_QUERY_SECONDS']
+        request_metrics.query_count_warning = app.config['QUERY_COUNT_WARNING']
+        request_metrics.slow_query_parameters = app.config['SLOW_QUERY_PARAMETERS']
+        request_metrics.install(app, db.engine)
+
+        # Separate read-only pool on the same file for @read_only views
+        if app.config['READ_REPLICA']:
+            replica = routing.create_replica_engine(db.engine, app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+            if replica is not None:
+                app.extensions['read_replica'] = replica
+                request_metrics.watch(replica)
+
+    # Session data stays server-side; the cookie only carries its id
+    if app.config['SESSION_STORE'] == 'sqlite':
+        os.makedirs(app.instance_path, exist_ok=True)
+        store = SQLiteSessionStore(app.config['SESSION_STORE_PATH'] or os.path.join(app.instance_path, 'sessions.db'),
+                                   app.config['SESSION_STORE_SIZE'])
+    else:
+        store = MemorySessionStore(app.config['SESSION_STORE_SIZE'])
+    app.session_interface = ServerSideSessionInterface(store)
+
+    alarm_scheduler.on_fire = lambda entry: _on_alarm_fired(app, entry)
+    session_status_worker.step = lambda: _advance_session_statuses(app)
+    session_archive_worker.step = lambda: _archive_old_sessions(app)
+    session_archive_worker.max_sleep = app.config['ARCHIVE_INTERVAL_SECONDS'] or 3600
+    dashboard_stats_cache.max_age = app.config['DASHBOARD_STATS_MAX_AGE']
+    dashboard_stats_cache.max_entries = app.config['USER_CACHE_SIZE']
+    session_key_cache.max_age = app.config['SESSION_KEY_MAX_AGE']
+    session_key_cache.max_entries = app.config['USER_CACHE_SIZE']
+    event_broker.max_streams = app.config['SSE_MAX_STREAMS']
+    catalog_cache.max_entries = app.config['CATALOG_CACHE_SIZE']
+    catalog_cache.max_age = app.config['CATALOG_CACHE_MAX_AGE']
+    password_hasher.method = app.config['PASSWORD_HASH_METHOD']
+    password_hasher.max_workers = app.config['PASSWORD_HASH_WORKERS']
+    password_hasher.max_pending = app.config['PASSWORD_HASH_QUEUE']
+    auth_ip_limiter.burst = app.config['AUTH_IP_BURST']
+    auth_ip_limiter.per_minute = app.config['AUTH_IP_PER_MINUTE']
+    auth_username_limiter.burst = app.config['AUTH_USERNAME_BURST']
+    auth_username_limiter.per_minute = app.config['AUTH_USERNAME_PER_MINUTE']
+    if app.config['ASSETS_BUNDLED']:
+        app.extensions['asset_manifest'] = assets.load_manifest(app.static_folder)
+        if app.extensions['asset_manifest'] is None:
+            app.logger.warning('No static/dist/manifest.json; run `flask --app app build-assets`')
+
+    app.register_blueprint(bp)
+    return app
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
\ No newline at end of file
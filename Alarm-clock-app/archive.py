@@ -0,0 +1,100 @@
+"""Moves long-finished study sessions out of the hot study_session table.
+
+Completed, non-deleted sessions that started more than ARCHIVE_AFTER_DAYS
+ago are copied to study_session_archive (same ids and columns) and
+deleted from study_session, a bounded batch per short transaction, so
+other writers wait at most one batch for the write lock. Everyday
+queries then only walk the recent rows; routes that ask for history
+read both tables through `session_union()`.
+
+Daily rollups are left as they are: an archived session still counts in
+/api/stats, and `rollups.rebuild()` reads both tables.
+"""
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+
+from models import db, StudySession, StudySessionArchive
+
+COLUMNS = ('id', 'user_id', 'subject', 'start_time', 'duration', 'status', 'notes',
+           'created_at', 'updated_at', 'deleted_at', 'book_id', 'change_seq')
+
+
+def horizon(now=None):
+    """Sessions starting before this may have been archived."""
+    return (now or datetime.now()) - timedelta(days=current_app.config['ARCHIVE_AFTER_DAYS'])
+
+
+def session_union(*columns, where=lambda model: db.true()):
+    """UNION ALL of `columns` from both tables.
+
+    `where(model)` builds each table's filter, so every branch uses its own
+    indexes; SQLite answers an ORDER BY on the union by merging the two
+    index-ordered branches, without sorting the combined rows.
+    """
+    return db.union_all(*(
+        db.select(*(getattr(model, column) for column in columns)).where(where(model))
+        for model in (StudySession, StudySessionArchive)
+    ))
+
+
+def _archivable(before):
+    # Served by ix_study_session_status_start
+    return db.and_(StudySession.status == 'completed', StudySession.start_time < before,
+                   StudySession.deleted_at.is_(None))
+
+
+def archive_batch(before, batch_size):
+    """Move up to `batch_size` sessions in one transaction; return how many."""
+    # The newest id stays: SQLite hands out max(id) + 1, and archiving it
+    # would let a new session reuse an archived id
+    newest = db.select(db.func.max(StudySession.id)).scalar_subquery()
+    ids = db.session.execute(
+        db.select(StudySession.id).where(_archivable(before), StudySession.id < newest)
+        .order_by(StudySession.start_time).limit(batch_size)
+    ).scalars().all()
+    if not ids:
+        db.session.rollback()
+        return 0
+
+    # Re-checked under the write lock, in case a session changed since
+    moved = db.and_(StudySession.id.in_(ids), _archivable(before))
+    db.session.execute(db.insert(StudySessionArchive).from_select(
+        COLUMNS + ('archived_at',),
+        db.select(*(getattr(StudySession, column) for column in COLUMNS),
+                  db.literal(datetime.utcnow(), db.DateTime)).where(moved)
+    ))
+    count = db.session.execute(
+        db.delete(StudySession).where(moved), execution_options={'synchronize_session': False}
+    ).rowcount
+    db.session.commit()
+    return count
+
+
+def archive_sessions(before, batch_size=500, pause=0.05):
+    """Archive every eligible session started before `before`; return the count."""
+    total = 0
+    while True:
+        count = archive_batch(before, batch_size)
+        total += count
+        if count == 0:
+            return total
+        # Let other writers take the lock between batches
+        time.sleep(pause)
+
+
+@click.command('archive-sessions')
+@click.option('--batch-size', type=int, default=None, help='Sessions moved per transaction.')
+def archive_sessions_command(batch_size):
+    """Move completed study sessions older than ARCHIVE_AFTER_DAYS to the archive."""
+    db.create_all()
+    start = time.perf_counter()
+    # Reads only look in the archive for ranges before horizon(), so the
+    # cut-off always comes from the config
+    before = horizon()
+    total = archive_sessions(before, batch_size or current_app.config['ARCHIVE_BATCH_SIZE'],
+                             current_app.config['ARCHIVE_PAUSE_SECONDS'])
+    click.echo(f'Archived {total} sessions started before {before:%Y-%m-%d} '
+               f'in {time.perf_counter() - start:.1f} s')
@@ -0,0 +1,154 @@
+"""Bundled, minified, content-hashed and precompressed CSS/JS.
+
+`flask --app app build-assets` concatenates the files each page uses
+(BUNDLES), minifies them conservatively and writes
+`static/dist/<name>.<hash>.<ext>` plus `.gz` (and `.br` when the optional
+brotli package is installed) and a manifest.json mapping bundle names to
+the hashed files. Templates link bundles with `asset_url('<name>')`.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import time
+
+import click
+from flask import current_app
+
+try:
+    import brotli
+except ImportError:  # optional; gzip alone is enough to serve compressed
+    brotli = None
+
+# Bundle name -> files under static/, in page order
+BUNDLES = {
+    'auth.css': ['css/auth.css'],
+    'dashboard.css': ['css/dashboard.css'],
+    'dashboard.js': ['js/home.js', 'js/dashboard.js'],
+    'clock.css': ['css/clock.css'],
+    'clock.js': ['js/clock.js'],
+    'alarm-clock.css': ['css/alarm-clock.css'],
+    'alarm-clock.js': ['js/alarm-clock.js'],
+    'schedule.css': ['css/schedule.css'],
+    'schedule.js': ['js/schedule.js'],
+    'stop-watch.css': ['css/stop-watch.css', 'css/dashboard.css'],
+    'stop-watch.js': ['js/dashboard.js', 'js/stop-watch.js'],
+    'register.css': ['css/register.css'],
+    'register.js': ['js/register.js'],
+    'sign-up.css': ['css/sign-up.css'],
+    'main.css': ['css/main.css'],
+    'script.js': ['js/script.js'],
+}
+
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+CONTENT_TYPES = {'.css': 'text/css', '.js': 'text/javascript'}
+
+
+def minify_css(source):
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    lines = (line.strip() for line in source.splitlines())
+    source = '\n'.join(line for line in lines if line)
+    return re.sub(r'\s*([{};])\s*', r'\1', source)
+
+
+def minify_js(source):
+    """Drop indentation, blank lines and whole-line // comments.
+
+    Lines inside template literals are left exactly as written; nothing
+    inside a line is rewritten, so string and regex contents are safe.
+    """
+    output = []
+    in_template = False
+    for line in source.splitlines():
+        if not in_template:
+            stripped = line.strip()
+            if not stripped or stripped.startswith('//'):
+                continue
+            line = stripped
+        else:
+            line = line.rstrip()
+        quote = None
+        index = 0
+        while index < len(line):
+            char = line[index]
+            if char == '\\':
+                index += 2
+                continue
+            if quote:
+                if char == quote:
+                    quote = None
+            elif in_template:
+                if char == '`':
+                    in_template = False
+            elif char in '\'"':
+                quote = char
+            elif char == '`':
+                in_template = True
+            elif line.startswith('//', index):
+                break
+            index += 1
+        output.append(line)
+    return '\n'.join(output) + '\n'
+
+
+def bundle_source(static_folder, name):
+    """The minified contents of one bundle."""
+    minify = minify_css if name.endswith('.css') else minify_js
+    parts = []
+    for path in BUNDLES[name]:
+        with open(os.path.join(static_folder, path), encoding='utf-8') as f:
+            parts.append(minify(f.read()))
+    # A statement left open at the end of one script must not swallow the next
+    separator = '\n' if name.endswith('.css') else ';\n'
+    return separator.join(parts).encode('utf-8')
+
+
+def build(static_folder):
+    """Write every bundle and the manifest; return {name: (file, bytes, gzip bytes)}."""
+    dist = os.path.join(static_folder, DIST_DIR)
+    os.makedirs(dist, exist_ok=True)
+    manifest, sizes = {}, {}
+    for name in BUNDLES:
+        body = bundle_source(static_folder, name)
+        stem, ext = os.path.splitext(name)
+        filename = f'{stem}.{hashlib.sha256(body).hexdigest()[:12]}{ext}'
+        compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        with open(os.path.join(dist, filename), 'wb') as f:
+            f.write(body)
+        with open(os.path.join(dist, filename + '.gz'), 'wb') as f:
+            f.write(compressed)
+        if brotli is not None:
+            with open(os.path.join(dist, filename + '.br'), 'wb') as f:
+                f.write(brotli.compress(body, quality=11))
+        manifest[name] = filename
+        sizes[name] = (filename, len(body), len(compressed))
+
+    # Files from earlier builds are kept so open pages can still load them
+    with open(os.path.join(dist, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return sizes
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, DIST_DIR, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+@click.command('build-assets')
+def build_assets_command():
+    """Bundle, minify, hash and precompress the CSS/JS under static/."""
+    start = time.perf_counter()
+    static_folder = current_app.static_folder
+    source_bytes = sum(os.path.getsize(os.path.join(static_folder, path))
+                       for path in {path for paths in BUNDLES.values() for path in paths})
+    sizes = build(static_folder)
+    for name, (filename, size, gzip_size) in sizes.items():
+        click.echo(f'{filename:<36} {size:>8} B  gzip {gzip_size:>7} B')
+    click.echo(f'{len(sizes)} bundles from {source_bytes} B of sources'
+               f'{"" if brotli is not None else " (brotli not installed: gzip only)"}'
+               f' in {time.perf_counter() - start:.2f} s')
@@ -0,0 +1,225 @@
+"""In-process HTTP benchmark of every hot route, with a regression gate.
+
+Seeds a throwaway database, then drives the app through the Flask test
+client from concurrent simulated users (one logged-in client per thread):
+
+    python benchmarks/bench_http.py                   # compare with the baseline
+    python benchmarks/bench_http.py --save-baseline   # record a new baseline
+
+For every route it reports throughput, p50/p95/p99 latency and SQL
+statements per request. Each route is measured --repeat times and the
+quietest round (lowest p95) is kept, which filters out scheduler noise. A
+route fails the run when its p95 is more than --threshold slower than the
+baseline, or when it issues at least one more query per request than the
+baseline did.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix='bench-http-'), 'bench.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+
+from sqlalchemy import event  # noqa: E402
+
+from app import create_app  # noqa: E402
+from models import db  # noqa: E402
+from seed import seed_database  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline_http.json')
+SEED_PASSWORD = 'password123'
+
+app = create_app('testing')
+query_counter = threading.local()
+
+
+def count_query(conn, cursor, statement, parameters, context, executemany):
+    query_counter.count = getattr(query_counter, 'count', 0) + 1
+
+
+class SimulatedUser:
+    def __init__(self, user_id, book_ids):
+        self.user_id = user_id
+        self.book_ids = book_ids
+        self.client = app.test_client()
+        self.alarm_ids = []
+        self.session_ids = []
+        self.turn = 0
+
+    def book_id(self):
+        self.turn += 1
+        return self.book_ids[(self.user_id * 7 + self.turn) % len(self.book_ids)]
+
+    def login(self):
+        return self.client.post('/login', data={
+            'username': f'user{self.user_id}@seed.example.com',
+            'password': SEED_PASSWORD
+        })
+
+
+def create_alarm(user):
+    response = user.client.post('/api/alarms', json={'name': 'Bench', 'alarm_time': '10:30',
+                                                     'repeat_type': 'daily'})
+    user.alarm_ids.append(response.get_json()['id'])
+    return response
+
+
+def create_session(user):
+    response = user.client.post('/api/study-sessions', json={
+        'subject': 'Bench', 'start_time': '2030-01-01 09:00:00', 'duration': 45})
+    user.session_ids.append(response.get_json()['id'])
+    return response
+
+
+# Autocomplete-style searches: partial last words, as typed
+SEARCH_QUERIES = ['intro', 'modern phys', 'smith', 'handbook la', 'garcia chem', 'foundations of hist']
+
+
+def search_books(user):
+    user.turn += 1
+    return user.client.get('/api/books/search', query_string={
+        'q': SEARCH_QUERIES[(user.user_id + user.turn) % len(SEARCH_QUERIES)]})
+
+
+# (name, action) pairs, run in this order so the CRUD phases find their rows
+ROUTES = [
+    ('POST /login', lambda user: user.login()),
+    ('GET /dashboard', lambda user: user.client.get('/dashboard')),
+    ('GET /api/dashboard/stats', lambda user: user.client.get('/api/dashboard/stats')),
+    ('GET /api/alarms', lambda user: user.client.get('/api/alarms')),
+    ('POST /api/alarms', create_alarm),
+    ('PUT /api/alarms/<id>', lambda user: user.client.put(
+        f'/api/alarms/{user.alarm_ids[user.turn % len(user.alarm_ids)]}', json={'volume': 50})),
+    ('DELETE /api/alarms/<id>', lambda user: user.client.delete(f'/api/alarms/{user.alarm_ids.pop()}')),
+    ('GET /api/study-sessions', lambda user: user.client.get('/api/study-sessions')),
+    ('POST /api/study-sessions', create_session),
+    ('PUT /api/study-sessions/<id>', lambda user: user.client.put(
+        f'/api/study-sessions/{user.session_ids[user.turn % len(user.session_ids)]}',
+        json={'notes': 'bench'})),
+    ('DELETE /api/study-sessions/<id>', lambda user: user.client.delete(
+        f'/api/study-sessions/{user.session_ids.pop()}')),
+    ('GET /api/books', lambda user: user.client.get('/api/books')),
+    ('GET /api/books/search', search_books),
+    ('GET /api/books/<id>', lambda user: user.client.get(f'/api/books/{user.book_id()}')),
+    ('PUT /api/books/<id>/progress', lambda user: user.client.put(
+        f'/api/books/{user.book_id()}/progress', json={'current_page': user.turn % 50})),
+]
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_route(action, users, requests_per_user):
+    def user_loop(user):
+        samples = []
+        for _ in range(requests_per_user):
+            query_counter.count = 0
+            start = time.perf_counter()
+            response = action(user)
+            elapsed = (time.perf_counter() - start) * 1000
+            if response.status_code >= 400:
+                raise RuntimeError(f'HTTP {response.status_code} from {response.request.path}')
+            samples.append((elapsed, query_counter.count))
+        return samples
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(users)) as pool:
+        samples = [sample for result in pool.map(user_loop, users) for sample in result]
+    wall = time.perf_counter() - start
+
+    latencies = sorted(elapsed for elapsed, _ in samples)
+    return {
+        'requests': len(samples),
+        'throughput_rps': round(len(samples) / wall, 1),
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+        'queries_per_request': round(sum(count for _, count in samples) / len(samples), 2),
+    }
+
+
+def compare(results, baseline, threshold):
+    failures = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if result['p95_ms'] > previous['p95_ms'] * (1 + threshold):
+            failures.append(f"{name}: p95 {result['p95_ms']} ms vs baseline {previous['p95_ms']} ms")
+        # Half a query of slack: occasional extra statements (a lazy refresh) average out
+        if result['queries_per_request'] > previous['queries_per_request'] + 0.5:
+            failures.append(f"{name}: {result['queries_per_request']} queries/request "
+                            f"vs baseline {previous['queries_per_request']}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=200, help='seeded users')
+    parser.add_argument('--sessions-per-user', type=int, default=200)
+    parser.add_argument('--books', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=8, help='simulated users in parallel')
+    parser.add_argument('--requests', type=int, default=25, help='requests per simulated user per route')
+    parser.add_argument('--repeat', type=int, default=3, help='rounds per route; the best one is kept')
+    parser.add_argument('--threshold', type=float, default=0.5,
+                        help='allowed p95 slowdown against the baseline (0.5 = 50%%)')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        seed_database(args.users, 4, args.sessions_per_user, args.books, 6, seed=0,
+                      password=SEED_PASSWORD)
+        event.listen(db.engine, 'before_cursor_execute', count_query)
+        if 'read_replica' in app.extensions:
+            event.listen(app.extensions['read_replica'], 'before_cursor_execute', count_query)
+
+        book_ids = list(range(1, args.books + 1))
+        users = [SimulatedUser(user_id, book_ids) for user_id in range(1, args.concurrency + 1)]
+        for user in users:
+            if not user.login().location.endswith('/dashboard'):
+                raise SystemExit(f'Could not log in as seeded user {user.user_id}')
+
+        results = {}
+        print(f'{"route":<34}{"req/s":>9}{"p50":>9}{"p95":>9}{"p99":>9}{"queries":>9}')
+        for name, action in ROUTES:
+            result = min((run_route(action, users, args.requests) for _ in range(args.repeat)),
+                         key=lambda round_result: round_result['p95_ms'])
+            results[name] = result
+            print(f'{name:<34}{result["throughput_rps"]:>9}{result["p50_ms"]:>9}'
+                  f'{result["p95_ms"]:>9}{result["p99_ms"]:>9}{result["queries_per_request"]:>9}')
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'Baseline written to {args.baseline}')
+        return
+
+    if not os.path.exists(args.baseline):
+        print('No baseline yet; run with --save-baseline to record one.')
+        return
+    with open(args.baseline) as f:
+        failures = compare(results, json.load(f), args.threshold)
+    if failures:
+        print('\nREGRESSIONS:')
+        for failure in failures:
+            print(f'  {failure}')
+        sys.exit(1)
+    print('\nNo regressions against the baseline.')
+
+
+if __name__ == '__main__':
+    main()
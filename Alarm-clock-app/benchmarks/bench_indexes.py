@@ -0,0 +1,182 @@
+"""Query plans and latency of the hot routes before and after `flask migrate`.
+
+Builds a throwaway SQLite database with the pre-index schema, loads it with
+synthetic sessions, then drives the routes through the Flask test client:
+
+    python benchmarks/bench_indexes.py --sessions 1000000
+
+Every SQL statement a route issues is captured and shown with its
+EXPLAIN QUERY PLAN, so a full scan (`SCAN study_session`) versus an index
+search (`SEARCH study_session USING INDEX ...`) is visible per route.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix='bench-indexes-'), 'bench.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+
+from sqlalchemy import event  # noqa: E402
+
+import migrations  # noqa: E402
+from app import catalog_cache, create_app, dashboard_stats_cache  # noqa: E402
+from models import db  # noqa: E402
+
+app = create_app('testing')
+
+
+def drop_model_indexes():
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.drop(conn)
+
+
+def populate(users, sessions, alarms_per_user, books, seed):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(DB_PATH)
+    now = datetime.now()
+    created = now.strftime('%Y-%m-%d %H:%M:%S.%f')
+    conn.executemany(
+        'INSERT INTO user (id, username, password) VALUES (?, ?, ?)',
+        ((i, f'user{i}@example.com', 'password') for i in range(1, users + 1)))
+    conn.executemany(
+        'INSERT INTO book (id, title, author, category, total_pages, current_page, '
+        'reading_progress, status, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        ((i, f'Book {i}', f'Author {i % 97}', 'General', 300, 0, 0.0, 'available', created)
+         for i in range(1, books + 1)))
+    conn.executemany(
+        'INSERT INTO alarm (user_id, name, alarm_time, repeat_type, sound_type, volume, '
+        'is_active, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        ((u, 'Break', f'{rng.randrange(24):02d}:{rng.randrange(60):02d}', 'daily', 'bell', 80,
+          rng.random() < 0.7, created, created)
+         for u in range(1, users + 1) for _ in range(alarms_per_user)))
+
+    def session_rows():
+        for _ in range(sessions):
+            start = now - timedelta(minutes=rng.randrange(365 * 24 * 60))
+            yield (rng.randrange(1, users + 1), 'Study', start.strftime('%Y-%m-%d %H:%M:%S.%f'),
+                   rng.choice((25, 50, 90)), 'completed', created, created, rng.randrange(1, books + 1))
+
+    conn.executemany(
+        'INSERT INTO study_session (user_id, subject, start_time, duration, status, '
+        'created_at, updated_at, book_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)', session_rows())
+    conn.commit()
+    conn.execute('ANALYZE')
+    conn.close()
+
+
+ROUTES = [
+    ('dashboard', 'GET', '/dashboard'),
+    ('dashboard stats', 'GET', '/api/dashboard/stats'),
+    ('list alarms', 'GET', '/api/alarms'),
+    ('list study sessions', 'GET', '/api/study-sessions'),
+    ('book detail', 'GET', '/api/books/{book_id}'),
+]
+
+
+def run_routes(users, books, requests, seed):
+    rng = random.Random(seed)
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    # @read_only views run on the read-only pool's engine (routing.py)
+    engines = [db.engine]
+    if 'read_replica' in app.extensions:
+        engines.append(app.extensions['read_replica'])
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', capture)
+    results = {}
+    client = app.test_client()
+    try:
+        for name, method, path in ROUTES:
+            timings = []
+            statements = {}
+            for _ in range(requests):
+                with client.session_transaction() as sess:
+                    sess['user_id'] = rng.randrange(1, users + 1)
+                # Every request goes to SQLite, not to a response cached by
+                # an earlier request (or the run before, with the same seed)
+                dashboard_stats_cache.invalidate_all()
+                catalog_cache.bump()
+                captured.clear()
+                url = path.format(book_id=rng.randrange(1, books + 1))
+                start = time.perf_counter()
+                response = client.open(url, method=method)
+                timings.append((time.perf_counter() - start) * 1000)
+                assert response.status_code == 200, (url, response.status_code)
+                for statement, parameters in captured:
+                    statements.setdefault(statement, parameters)
+            results[name] = (timings, statements)
+    finally:
+        for engine in engines:
+            event.remove(engine, 'before_cursor_execute', capture)
+    return results
+
+
+def query_plans(statements):
+    conn = db.engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        for statement, parameters in statements.items():
+            cursor.execute(f'EXPLAIN QUERY PLAN {statement}', parameters)
+            yield statement, [row[-1] for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+
+def report(label, results):
+    print(f'\n=== {label} ===')
+    for name, (timings, statements) in results.items():
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1] if len(timings) > 1 else timings[0]
+        print(f'\n{name}: median {statistics.median(timings):.2f} ms, p95 {p95:.2f} ms')
+        for statement, plan in query_plans(statements):
+            print('  ' + ' '.join(statement.split())[:100])
+            for step in plan:
+                print(f'    -> {step}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--sessions', type=int, default=1_000_000)
+    parser.add_argument('--alarms-per-user', type=int, default=5)
+    parser.add_argument('--books', type=int, default=500)
+    parser.add_argument('--requests', type=int, default=50, help='requests per route')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        drop_model_indexes()
+        print(f'Loading {args.sessions} sessions for {args.users} users into {DB_PATH} ...')
+        start = time.perf_counter()
+        populate(args.users, args.sessions, args.alarms_per_user, args.books, args.seed)
+        print(f'Loaded in {time.perf_counter() - start:.1f} s')
+
+        report('before (no indexes)', run_routes(args.users, args.books, args.requests, args.seed))
+
+        start = time.perf_counter()
+        applied = migrations.upgrade(db)
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql('ANALYZE')
+        print(f'\nflask migrate: {", ".join(applied)} ({time.perf_counter() - start:.1f} s)')
+
+        report('after (flask migrate)', run_routes(args.users, args.books, args.requests, args.seed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Login throughput and latency during a credential-stuffing burst.
+
+Seeds a throwaway database with production-cost password hashes, then for
+a fixed time drives /login through the Flask test client from attacker
+threads (wrong passwords for random usernames, from a handful of IPs)
+while legitimate users log in from their own IPs and a logged-in client
+polls a cheap API route:
+
+    python benchmarks/bench_login.py
+    python benchmarks/bench_login.py --attackers 32 --seconds 10
+
+The run is done twice, without and with the token-bucket limiter, and
+reports attack responses by status, password hashes computed, and the
+latency legitimate logins and the unrelated route saw under attack.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix='bench-login-'), 'bench.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+
+from app import auth_ip_limiter, auth_username_limiter, create_app, password_hasher  # noqa: E402
+from config import Config  # noqa: E402
+from models import db  # noqa: E402
+from seed import seed_database  # noqa: E402
+
+SEED_PASSWORD = 'password123'
+
+app = create_app('testing')
+# Production hashing cost, not the cheap testing one
+app.config['PASSWORD_HASH_METHOD'] = password_hasher.method = Config.PASSWORD_HASH_METHOD
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))] if values else 0
+
+
+def run(args, throttled):
+    app.config['AUTH_RATE_LIMITS'] = throttled
+    auth_ip_limiter.reset()
+    auth_username_limiter.reset()
+    password_hasher.calls = password_hasher.rejected = 0
+    stop = threading.Event()
+    attack_statuses = Counter()
+    legit_ms, legit_ok, probe_ms = [], [], []
+    lock = threading.Lock()
+
+    def attacker(index):
+        client = app.test_client()
+        rng = random.Random(index)
+        ip = f'10.0.0.{index % args.attacker_ips + 1}'
+        while not stop.is_set():
+            response = client.post('/login', environ_base={'REMOTE_ADDR': ip}, data={
+                'username': f'user{rng.randrange(1, args.users + 1)}@seed.example.com',
+                'password': f'guess{rng.random()}'})
+            with lock:
+                attack_statuses[response.status_code] += 1
+
+    def legitimate_login(user_id):
+        client = app.test_client()
+        start = time.perf_counter()
+        response = client.post('/login', environ_base={'REMOTE_ADDR': f'192.168.{user_id // 250}.{user_id % 250}'},
+                               data={'username': f'user{user_id}@seed.example.com', 'password': SEED_PASSWORD})
+        with lock:
+            legit_ms.append((time.perf_counter() - start) * 1000)
+            legit_ok.append(response.status_code == 302 and response.location.endswith('/dashboard'))
+
+    def legitimate_users():
+        # One login per user, each from its own address, at a steady rate
+        # whether or not earlier ones have finished
+        logins = []
+        for user_id in range(1, args.users + 1):
+            if stop.wait(args.seconds / args.users):
+                break
+            logins.append(threading.Thread(target=legitimate_login, args=(user_id,)))
+            logins[-1].start()
+        for login in logins:
+            login.join()
+
+    def probe():
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = 1
+        while not stop.is_set():
+            start = time.perf_counter()
+            client.get('/api/dashboard/stats')
+            probe_ms.append((time.perf_counter() - start) * 1000)
+            stop.wait(0.01)
+
+    threads = [threading.Thread(target=attacker, args=(i,)) for i in range(args.attackers)]
+    threads += [threading.Thread(target=legitimate_users), threading.Thread(target=probe)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    attempts = sum(attack_statuses.values())
+    print(f'\n{"with" if throttled else "without"} rate limiting, {args.attackers} attacker threads '
+          f'from {args.attacker_ips} IPs, {args.seconds} s')
+    print(f'  attack requests      {attempts} ({attempts / args.seconds:.0f}/s): '
+          + ', '.join(f'{status}: {count}' for status, count in sorted(attack_statuses.items())))
+    print(f'  password hashes      {password_hasher.calls} ({password_hasher.calls / args.seconds:.0f}/s), '
+          f'{password_hasher.rejected} turned away with 503')
+    print(f'  legitimate logins    {sum(legit_ok)}/{len(legit_ok)} succeeded, '
+          f'p50 {percentile(legit_ms, 0.5):.0f} ms, p95 {percentile(legit_ms, 0.95):.0f} ms')
+    print(f'  GET /api/dashboard/stats  p50 {percentile(probe_ms, 0.5):.1f} ms, '
+          f'p95 {percentile(probe_ms, 0.95):.1f} ms over {len(probe_ms)} requests')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=50, help='seeded users, each logging in once')
+    parser.add_argument('--attackers', type=int, default=16, help='attacker threads')
+    parser.add_argument('--attacker-ips', type=int, default=4, help='addresses the attackers share')
+    parser.add_argument('--seconds', type=float, default=30.0, help='duration of each run')
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        seed_database(args.users, 2, 20, 100, 1, seed=0, password=SEED_PASSWORD)
+    print(f'hash method {password_hasher.method}, {password_hasher.max_workers} hashing threads, '
+          f'queue {password_hasher.max_pending}')
+
+    single = time.perf_counter()
+    password_hasher.hash(SEED_PASSWORD)
+    print(f'one hash: {(time.perf_counter() - single) * 1000:.0f} ms')
+    run(args, throttled=False)
+    run(args, throttled=True)
+    password_hasher.shutdown()
+
+
+if __name__ == '__main__':
+    main()
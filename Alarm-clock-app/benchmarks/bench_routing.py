@@ -0,0 +1,117 @@
+"""Read latency while other clients write, with and without the read-only pool.
+
+Seeds a throwaway database, then for a fixed time runs writer threads
+(new study sessions and reading-progress updates) alongside reader
+threads that only browse the catalog and dashboard, each thread a
+separate logged-in client:
+
+    python benchmarks/bench_routing.py
+    python benchmarks/bench_routing.py --writers 8 --readers 8 --seconds 10
+
+The run is done twice, with every view on the primary pool and with
+@read_only views on the `mode=ro` pool, and reports reader and writer
+throughput and latency for each.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix='bench-routing-'), 'bench.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+
+from app import create_app  # noqa: E402
+from models import db  # noqa: E402
+from seed import seed_database  # noqa: E402
+
+app = create_app('testing')
+replica = app.extensions.get('read_replica')
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))] if values else 0
+
+
+def reader_requests(client, turn, books):
+    book_id = turn * 7 % books + 1
+    return (client.get('/api/books', query_string={'page': turn % 5 + 1}),
+            client.get(f'/api/books/{book_id}'),
+            client.get('/api/dashboard/stats'),
+            client.get('/dashboard'))
+
+
+def writer_requests(client, turn, books):
+    return (client.post('/api/study-sessions', json={
+                'subject': 'Bench', 'start_time': '2030-01-01 09:00:00', 'duration': 45}),
+            client.put(f'/api/books/{turn * 11 % books + 1}/progress', json={'current_page': turn % 300}))
+
+
+def run(args, routed):
+    if routed:
+        app.extensions['read_replica'] = replica
+    else:
+        app.extensions.pop('read_replica', None)
+    stop = threading.Event()
+    timings = {'reader': [], 'writer': []}
+    lock = threading.Lock()
+
+    def client_loop(kind, user_id, requests):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = user_id
+        turn = 0
+        while not stop.is_set():
+            turn += 1
+            start = time.perf_counter()
+            for response in requests(client, turn, args.books):
+                if response.status_code >= 400:
+                    raise SystemExit(f'{response.request.path} returned {response.status_code}')
+            with lock:
+                timings[kind].append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=client_loop, args=('writer', i + 1, writer_requests))
+               for i in range(args.writers)]
+    threads += [threading.Thread(target=client_loop, args=('reader', args.writers + i + 1, reader_requests))
+                for i in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    print(f'\n{"read-only pool" if routed else "primary pool only"}, '
+          f'{args.writers} writers, {args.readers} readers, {args.seconds} s')
+    for kind, requests in (('reader', 4), ('writer', 2)):
+        values = timings[kind]
+        print(f'  {kind}s  {len(values) * requests / args.seconds:7.0f} req/s, '
+              f'{requests} requests per round: p50 {percentile(values, 0.5):.1f} ms, '
+              f'p95 {percentile(values, 0.95):.1f} ms, p99 {percentile(values, 0.99):.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers', type=int, default=4, help='writing client threads')
+    parser.add_argument('--readers', type=int, default=8, help='read-only client threads')
+    parser.add_argument('--books', type=int, default=2000, help='seeded books')
+    parser.add_argument('--seconds', type=float, default=10.0, help='duration of each run')
+    args = parser.parse_args()
+    if replica is None:
+        raise SystemExit('READ_REPLICA is off or the database is not a SQLite file')
+
+    with app.app_context():
+        db.create_all()
+        seed_database(args.writers + args.readers, 2, 200, args.books, 3, seed=0)
+    run(args, routed=False)
+    run(args, routed=True)
+
+
+if __name__ == '__main__':
+    main()
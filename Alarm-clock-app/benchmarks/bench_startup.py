@@ -0,0 +1,67 @@
+"""Startup cost of importing the models and building the app.
+
+Times fresh interpreters (what a helper script or a new worker pays) and
+checks that neither step touches the database:
+
+    python benchmarks/bench_startup.py --runs 10 --max-ms 400
+
+Exits non-zero if any step is slower than --max-ms (median, interpreter
+start-up excluded) or creates the database file.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+STEPS = [
+    ('import models', 'import models'),
+    ('import app', 'import app'),
+    ('create_app()', 'from app import create_app; create_app()'),
+]
+
+
+def time_snippet(code, env, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=PROJECT_ROOT, env=env, check=True)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help='fail if a step takes longer than this (median)')
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='bench-startup-'), 'startup.db')
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}', PYTHONPATH=PROJECT_ROOT)
+
+    baseline = time_snippet('pass', env, args.runs)
+    print(f'interpreter start-up: {baseline:.1f} ms (subtracted below)')
+
+    failed = False
+    for name, code in STEPS:
+        elapsed = time_snippet(code, env, args.runs) - baseline
+        slow = args.max_ms is not None and elapsed > args.max_ms
+        print(f'{name:<16} {elapsed:8.1f} ms{"  SLOWER THAN --max-ms" if slow else ""}')
+        failed = failed or slow
+
+    if os.path.exists(db_path):
+        print('FAIL: start-up created the database file (DDL or I/O at import time)')
+        failed = True
+    else:
+        print('database untouched: no connection, no DDL')
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
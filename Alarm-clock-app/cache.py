@@ -0,0 +1,166 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class UserCache:
+    """Per-user LRU cache of one derived value, invalidated by write routes.
+
+    Each entry is stored under a `key` (e.g. today's date) so it expires on
+    its own when the key changes. Invalidation bumps a version counter, so
+    a value computed concurrently with a write is returned but never stored;
+    versions are only kept for users with a load in flight. At most
+    `max_entries` users are kept, least recently used first out. `max_age`
+    (seconds) additionally bounds staleness when writes can come from other
+    processes that cannot invalidate this one.
+    """
+
+    def __init__(self, max_entries=10000, max_age=None):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # user_id -> (key, value, stored_at)
+        self._loading = {}  # user_id -> [loads in flight, invalidations since the first]
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, user_id, key, loader):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] == key and (
+                    self.max_age is None or time.monotonic() - entry[2] < self.max_age):
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            loading = self._loading.setdefault(user_id, [0, 0])
+            loading[0] += 1
+            version = (self._generation, loading[1])
+
+        loaded = False
+        try:
+            value = loader()
+            loaded = True
+        finally:
+            with self._lock:
+                loading[0] -= 1
+                if not loading[0]:
+                    del self._loading[user_id]
+                if loaded and version == (self._generation, loading[1]):
+                    self._entries[user_id] = (key, value, time.monotonic())
+                    self._entries.move_to_end(user_id)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+            if user_id in self._loading:
+                self._loading[user_id][1] += 1
+
+    def invalidate_all(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+
+class CatalogCache:
+    """Shared LRU cache of values derived from the global book catalog.
+
+    Entries are keyed on (catalog version, key); `bump()` moves to a new
+    version whenever a book or a book's sessions change, so stale entries
+    are never served and a value loaded concurrently with a bump is not
+    stored. At most `max_entries` values are kept, least recently used
+    first out. `max_age` bounds staleness for writes made by other
+    processes, as in UserCache.
+    """
+
+    def __init__(self, max_entries=256, max_age=None):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (version, key) -> (value, stored_at)
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, key, loader):
+        with self._lock:
+            version = self.version
+            entry = self._entries.get((version, key))
+            if entry is not None and (self.max_age is None or time.monotonic() - entry[1] < self.max_age):
+                self._entries.move_to_end((version, key))
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        value = loader()
+
+        with self._lock:
+            if version == self.version:
+                self._entries[(version, key)] = (value, time.monotonic())
+                self._entries.move_to_end((version, key))
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def bump(self):
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+
+class UserKeyedCache:
+    """Per-user LRU of several values each (e.g. one per calendar week).
+
+    `get_or_load_many` fills every missing key for a user with one loader
+    call. `invalidate(user_id)` drops all of that user's entries and, as in
+    UserCache, keeps values loaded concurrently with it from being stored.
+    """
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (user_id, key) -> value
+        self._keys = {}      # user_id -> set of cached keys
+        self._versions = {}  # user_id -> int
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load_many(self, user_id, keys, loader):
+        """Return {key: value} for `keys`; `loader(missing_keys)` returns the same."""
+        values, missing = {}, []
+        with self._lock:
+            for key in keys:
+                if (user_id, key) in self._entries:
+                    self._entries.move_to_end((user_id, key))
+                    values[key] = self._entries[(user_id, key)]
+                else:
+                    missing.append(key)
+            self.hits += len(values)
+            self.misses += len(missing)
+            version = self._versions.get(user_id, 0)
+        if not missing:
+            return values
+
+        loaded = loader(missing)
+        values.update(loaded)
+
+        with self._lock:
+            if version == self._versions.get(user_id, 0):
+                for key, value in loaded.items():
+                    self._entries[(user_id, key)] = value
+                    self._entries.move_to_end((user_id, key))
+                    self._keys.setdefault(user_id, set()).add(key)
+                while len(self._entries) > self.max_entries:
+                    (old_user, old_key), _ = self._entries.popitem(last=False)
+                    self._keys[old_user].discard(old_key)
+        return values
+
+    def invalidate(self, user_id):
+        with self._lock:
+            for key in self._keys.pop(user_id, ()):
+                self._entries.pop((user_id, key), None)
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
@@ -0,0 +1,74 @@
+"""A database-assigned change sequence for delta sync and the change feed.
+
+updated_at is stamped by the process that writes the row, before that
+write has SQLite's write lock, so a row can commit after another one
+with a later updated_at; a reader whose `updated_at > since` watermark
+has already passed it never sees it. Instead every insert and update of
+an alarm or study session, ORM or bulk, numbers the row from one counter
+into `change_seq`, in triggers. SQLite runs one write transaction at a
+time, so the numbers follow commit order: a reader that sees a change
+numbered N also sees every change below N.
+
+The counter and triggers are created with the tables (db.create_all) or
+by `flask --app app migrate`, which also numbers existing rows.
+"""
+from sqlalchemy import event, text
+
+from models import db, Alarm, StudySession
+
+COUNTER = 'change_counter'
+TABLES = (Alarm.__table__, StudySession.__table__)
+
+
+def _number_row(table):
+    return (f"UPDATE {COUNTER} SET value = value + 1 WHERE id = 1; "
+            f"UPDATE {table} SET change_seq = (SELECT value FROM {COUNTER} WHERE id = 1) WHERE id = new.id;")
+
+
+def _ddl(table):
+    return [
+        f"CREATE TABLE IF NOT EXISTS {COUNTER} (id INTEGER PRIMARY KEY CHECK (id = 1), value INTEGER NOT NULL)",
+        f"INSERT OR IGNORE INTO {COUNTER} (id, value) VALUES (1, 0)",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_change_seq_insert AFTER INSERT ON {table} "
+        f"BEGIN {_number_row(table)} END",
+        # Skips the numbering UPDATE itself, which changes change_seq
+        f"CREATE TRIGGER IF NOT EXISTS {table}_change_seq_update AFTER UPDATE ON {table} "
+        f"WHEN new.change_seq IS old.change_seq BEGIN {_number_row(table)} END",
+    ]
+
+
+def create_sequence(connection, tables=TABLES):
+    """Create the counter and triggers if missing, and number unnumbered rows.
+
+    True if the counter was new.
+    """
+    if connection.dialect.name != 'sqlite':
+        return False
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': COUNTER}
+    ).first() is not None
+    for table in tables:
+        for statement in _ddl(table.name):
+            connection.execute(text(statement))
+        # Rows from before the triggers: the update trigger numbers them
+        connection.execute(text(f'UPDATE {table.name} SET change_seq = NULL WHERE change_seq IS NULL'))
+    return not exists
+
+
+def current(connection):
+    """The number of the latest committed change (visible to `connection`)."""
+    return connection.execute(text(f'SELECT value FROM {COUNTER} WHERE id = 1')).scalar()
+
+
+def _after_create(target, connection, **kw):
+    create_sequence(connection, [target])
+
+
+def _before_drop_all(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.execute(text(f'DROP TABLE IF EXISTS {COUNTER}'))
+
+
+for _table in TABLES:
+    event.listen(_table, 'after_create', _after_create)
+event.listen(db.metadata, 'before_drop', _before_drop_all)
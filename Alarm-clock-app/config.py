@@ -0,0 +1,120 @@
+import os
+import tempfile
+
+
+class Config:
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'your_secret_key_here')  # Change this to a random secret
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///database.db')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "connect_args": {"check_same_thread": False, "timeout": 30},
+        # One connection per request thread plus the scheduler/feed threads
+        "pool_size": int(os.environ.get('DB_POOL_SIZE', 10)),
+        "max_overflow": 10,
+        "pool_timeout": 30
+    }
+    SSE_HEARTBEAT_SECONDS = 25
+    # Open /api/events streams per process; beyond this the stream is
+    # refused (503) and the page polls instead. None: no limit. Streams
+    # served by the Flask route hold a request thread each; those of the
+    # stream server (stream_server.py) do not
+    SSE_MAX_STREAMS = int(os.environ['SSE_MAX_STREAMS']) if os.environ.get('SSE_MAX_STREAMS') else None
+    # With several worker processes each one polls for changes made by the
+    # others and bounds its cached counters' age; off for a single process
+    CHANGE_FEED_SECONDS = None
+    DASHBOARD_STATS_MAX_AGE = None
+    CATALOG_CACHE_MAX_AGE = None
+    # Rendered book catalog responses kept in memory (LRU)
+    CATALOG_CACHE_SIZE = int(os.environ.get('CATALOG_CACHE_SIZE', 256))
+    # Users whose dashboard counters and session key are kept in memory (LRU)
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 10000))
+    # Link the hashed bundles from `flask build-assets` instead of building
+    # them per request from the sources
+    ASSETS_BUNDLED = True
+    # Server-side sessions (session_store.py): 'memory', a per-process LRU of
+    # SESSION_STORE_SIZE sessions, or 'sqlite', a file shared by all worker
+    # processes (SESSION_STORE_PATH, default instance/sessions.db)
+    SESSION_STORE = os.environ.get('SESSION_STORE', 'memory')
+    SESSION_STORE_PATH = os.environ.get('SESSION_STORE_PATH')
+    SESSION_STORE_SIZE = int(os.environ.get('SESSION_STORE_SIZE', 10000))
+    # How long a process may trust its copy of a user's session key; a key
+    # replaced elsewhere (reset_my_account.py) ends sessions within this
+    SESSION_KEY_MAX_AGE = 5
+    # @read_only views read through a second, `mode=ro` connection pool on
+    # the same SQLite file; a client that wrote within the last
+    # READ_YOUR_WRITES_SECONDS reads from the primary instead
+    READ_REPLICA = True
+    READ_YOUR_WRITES_SECONDS = 5
+    # Completed study sessions older than this move to study_session_archive
+    # (archive.py), in batches of ARCHIVE_BATCH_SIZE with a pause between
+    # them; every ARCHIVE_INTERVAL_SECONDS in the background when set
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 180))
+    ARCHIVE_BATCH_SIZE = 500
+    ARCHIVE_PAUSE_SECONDS = 0.05
+    ARCHIVE_INTERVAL_SECONDS = None
+    # werkzeug hash method (and so cost) for new passwords; stored hashes
+    # made with another method are replaced at the user's next login
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    # Threads hashing passwords at once, and calls allowed to queue for them
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 8))
+    # Token buckets in front of POST /login and /register: a burst of
+    # attempts, then so many a minute, per client IP and per username
+    AUTH_RATE_LIMITS = True
+    AUTH_IP_BURST = 10
+    AUTH_IP_PER_MINUTE = 5
+    AUTH_USERNAME_BURST = 5
+    AUTH_USERNAME_PER_MINUTE = 5
+    # Statements at least this slow are sampled on /metrics, without their
+    # bound parameters (user data) unless SLOW_QUERY_PARAMETERS is set
+    SLOW_QUERY_SECONDS = float(os.environ.get('SLOW_QUERY_SECONDS', 0.1))
+    SLOW_QUERY_PARAMETERS = os.environ.get('SLOW_QUERY_PARAMETERS') == '1'
+    # /metrics answers requests from these addresses, or carrying
+    # `Authorization: Bearer <METRICS_TOKEN>`; anyone else gets a 404
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    METRICS_ALLOWED_IPS = os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+    # Log a warning when one request issues more statements than this
+    QUERY_COUNT_WARNING = None
+
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+    ASSETS_BUNDLED = False
+    QUERY_COUNT_WARNING = int(os.environ.get('QUERY_COUNT_WARNING', 20))
+
+
+class ProductionConfig(Config):
+    # Request threads hold no streams: the reverse proxy sends /api/events
+    # to the stream server (run_app.py --streams), and a stream that still
+    # reaches a worker gets a 503 and its page polls
+    SSE_MAX_STREAMS = int(os.environ.get('SSE_MAX_STREAMS', 0))
+    # Several worker processes must see the same sessions
+    SESSION_STORE = os.environ.get('SESSION_STORE', 'sqlite')
+    SESSION_STORE_SIZE = int(os.environ.get('SESSION_STORE_SIZE', 100000))
+    CHANGE_FEED_SECONDS = float(os.environ.get('CHANGE_FEED_SECONDS', 2))
+    DASHBOARD_STATS_MAX_AGE = float(os.environ.get('DASHBOARD_STATS_MAX_AGE', 30))
+    CATALOG_CACHE_MAX_AGE = float(os.environ.get('CATALOG_CACHE_MAX_AGE', 30))
+    ARCHIVE_INTERVAL_SECONDS = float(os.environ.get('ARCHIVE_INTERVAL_SECONDS', 3600))
+    # Behind a reverse proxy on this host every request comes from
+    # loopback, so production needs the token unless addresses are listed
+    METRICS_ALLOWED_IPS = [ip for ip in os.environ.get('METRICS_ALLOWED_IPS', '').split(',') if ip]
+
+
+class TestingConfig(Config):
+    TESTING = True
+    # A file, not `sqlite://`: an in-memory database is one connection that
+    # the background workers would share with (and roll back under) requests
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///' + os.path.join(
+        tempfile.mkdtemp(prefix='alarm-clock-testing-'), 'test.db')
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    ASSETS_BUNDLED = False
+    # Cheap hashes and no throttling, so tests can log in many users quickly
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+    AUTH_RATE_LIMITS = False
+
+
+CONFIGS = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'testing': TestingConfig,
+}
@@ -7,7 +7,11 @@ PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '.'))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-from app import app, db, User
+from app import create_app
+from models import db, User
+from passwords import hash_password
+
+app = create_app()
 
 def create_test_user():
     with app.app_context():
@@ -19,7 +23,7 @@ def create_test_user():
             print(f"User already exists: {username}")
             return False
 
-        test_user = User(username=username, password=password)
+        test_user = User(username=username, password=hash_password(password))
         db.session.add(test_user)
         db.session.commit()
         print(f'Created test user: email={test_user.username}, password={password}')
@@ -0,0 +1,101 @@
+import json
+import threading
+from collections import deque
+
+
+class StreamsFull(Exception):
+    """This worker already holds its maximum number of open streams."""
+
+
+def format_sse(event, data):
+    """Encode one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class Subscription:
+    """One open /api/events stream.
+
+    Holds a small bounded buffer and a condition variable. A reader either
+    blocks in `get()`, holding its thread for as long as the stream is
+    open (the Flask route), or is told about new messages by `on_push`
+    and takes them with `get(0)` (stream_server.py's event loop).
+    """
+
+    def __init__(self, user_id, max_pending=100, on_push=None):
+        self.user_id = user_id
+        self.on_push = on_push
+        self._pending = deque(maxlen=max_pending)  # oldest messages drop first
+        self._cond = threading.Condition()
+
+    def push(self, message):
+        with self._cond:
+            self._pending.append(message)
+            self._cond.notify()
+        if self.on_push is not None:
+            self.on_push()
+
+    def get(self, timeout=None):
+        """Return the next message, or None if `timeout` expires first."""
+        with self._cond:
+            if not self._pending:
+                self._cond.wait(timeout)
+            if not self._pending:
+                return None
+            return self._pending.popleft()
+
+
+class EventBroker:
+    """Per-user fan-out registry for server-sent events.
+
+    At most `max_streams` (None: no limit) are open at once; `subscribe`
+    raises StreamsFull beyond that and clients poll instead.
+    """
+
+    def __init__(self, max_pending=100, max_streams=None):
+        self.max_pending = max_pending
+        self.max_streams = max_streams
+        self._lock = threading.Lock()
+        self._subscribers = {}  # user_id -> set of Subscription
+        self._count = 0
+        self.rejected = 0
+
+    def subscribe(self, user_id, on_push=None):
+        subscription = Subscription(user_id, self.max_pending, on_push)
+        with self._lock:
+            if self.max_streams is not None and self._count >= self.max_streams:
+                self.rejected += 1
+                raise StreamsFull()
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+            self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(subscription.user_id)
+            if subscriptions is not None and subscription in subscriptions:
+                subscriptions.discard(subscription)
+                self._count -= 1
+                if not subscriptions:
+                    del self._subscribers[subscription.user_id]
+
+    def publish(self, user_id, event, data=None):
+        """Queue `event` for every open stream of `user_id`."""
+        with self._lock:
+            subscriptions = list(self._subscribers.get(user_id, ()))
+        if not subscriptions:
+            return 0
+        message = format_sse(event, data if data is not None else {})
+        for subscription in subscriptions:
+            subscription.push(message)
+        return len(subscriptions)
+
+    def broadcast(self, event, data=None):
+        """Queue `event` for every open stream of every user."""
+        with self._lock:
+            user_ids = list(self._subscribers)
+        for user_id in user_ids:
+            self.publish(user_id, event, data)
+
+    def connection_count(self):
+        with self._lock:
+            return self._count
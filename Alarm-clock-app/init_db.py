@@ -1,4 +1,8 @@
-from app import app, db, User, Alarm, StudySession, Book
+from app import create_app
+from models import db, User
+from passwords import hash_password
+
+app = create_app()
 
 def init_db():
     with app.app_context():
@@ -11,7 +15,7 @@ def init_db():
         # Create a test user
         test_user = User(
             username="test@example.com",
-            password="password123"
+            password=hash_password("password123")
         )
         db.session.add(test_user)
         db.session.commit()
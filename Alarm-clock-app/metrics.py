@@ -0,0 +1,155 @@
+import bisect
+import logging
+import threading
+import time
+from collections import deque
+
+from flask import request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def render(self, name, **labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{_labels(**labels, le=bound)} {cumulative}'
+        yield f'{name}_sum{_labels(**labels)} {self.total}'
+        yield f'{name}_count{_labels(**labels)} {self.count}'
+
+
+class RequestMetrics:
+    """Per-endpoint latency, SQL statement counts and DB time.
+
+    Engine events attribute each statement to the request running on the
+    same thread; statements from background threads are not counted.
+    Statements slower than `slow_query_seconds` are kept (the most recent
+    `slow_query_samples` of them) with their text and timing only. With
+    `slow_query_parameters` their bound parameters are kept too, except
+    for statements that touch a password column.
+    """
+
+    def __init__(self, slow_query_seconds=0.1, slow_query_samples=20, query_count_warning=None,
+                 slow_query_parameters=False):
+        self.slow_query_seconds = slow_query_seconds
+        self.slow_query_parameters = slow_query_parameters
+        self.query_count_warning = query_count_warning
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._latency = {}   # (endpoint, method) -> Histogram
+        self._queries = {}   # (endpoint, method) -> Histogram
+        self._db_time = {}   # (endpoint, method) -> Histogram
+        self._responses = {}  # (endpoint, method, status) -> int
+        self.slow_queries = deque(maxlen=slow_query_samples)
+
+    def install(self, app, engine):
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.teardown_request(self._clear_request)
+        self.watch(engine)
+
+    def watch(self, engine):
+        """Count and time the statements of another engine too."""
+        event.listen(engine, 'before_cursor_execute', self._before_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_execute)
+
+    def _start_request(self):
+        self._local.request = {'start': time.perf_counter(), 'queries': 0, 'db_time': 0.0}
+
+    def _finish_request(self, response):
+        state = getattr(self._local, 'request', None)
+        if state is None:
+            return response
+        elapsed = time.perf_counter() - state['start']
+        key = (request.endpoint or 'unmatched', request.method)
+
+        with self._lock:
+            self._latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(elapsed)
+            self._queries.setdefault(key, Histogram(QUERY_COUNT_BUCKETS)).observe(state['queries'])
+            self._db_time.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(state['db_time'])
+            status_key = key + (response.status_code,)
+            self._responses[status_key] = self._responses.get(status_key, 0) + 1
+
+        if self.query_count_warning is not None and state['queries'] > self.query_count_warning:
+            logger.warning('%s %s issued %d SQL statements (limit %d); possible N+1 query',
+                           request.method, request.path, state['queries'], self.query_count_warning)
+        return response
+
+    def _clear_request(self, exc):
+        self._local.request = None
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start'].pop()
+        state = getattr(self._local, 'request', None)
+        if state is not None:
+            state['queries'] += 1
+            state['db_time'] += elapsed
+        if elapsed >= self.slow_query_seconds:
+            sample = {
+                'endpoint': request.endpoint if state is not None else 'background',
+                'statement': ' '.join(statement.split()),
+                'seconds': elapsed
+            }
+            if self.slow_query_parameters:
+                sample['parameters'] = '<redacted>' if 'password' in statement else repr(parameters)[:200]
+            with self._lock:
+                self.slow_queries.append(sample)
+
+    def render(self):
+        """Everything recorded so far, in the Prometheus text exposition format."""
+        with self._lock:
+            lines = [
+                '# HELP http_requests_total Responses by endpoint, method and status.',
+                '# TYPE http_requests_total counter',
+            ]
+            for (endpoint, method, status), count in sorted(self._responses.items()):
+                lines.append(f'http_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {count}')
+
+            for name, help_text, histograms in (
+                    ('http_request_duration_seconds', 'Request latency.', self._latency),
+                    ('http_request_sql_queries', 'SQL statements issued per request.', self._queries),
+                    ('http_request_db_seconds', 'Time spent in SQL per request.', self._db_time)):
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+                for (endpoint, method), histogram in sorted(histograms.items()):
+                    lines.extend(histogram.render(name, endpoint=endpoint, method=method))
+
+            lines += [
+                '# HELP sql_slow_query_seconds Most recent statements slower than the slow-query threshold.',
+                '# TYPE sql_slow_query_seconds gauge',
+            ]
+            for sample in self.slow_queries:
+                labels = {'endpoint': sample['endpoint'], 'statement': sample['statement'][:500]}
+                if 'parameters' in sample:
+                    labels['parameters'] = sample['parameters']
+                labels = _labels(**labels)
+                lines.append(f'sql_slow_query_seconds{labels} {sample["seconds"]:.6f}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,53 @@
+"""Bring an existing database up to the current models without dropping data.
+
+`db.create_all()` only creates tables that are missing entirely; it never
+touches tables that already exist, so new columns and indexes on old
+tables would otherwise require the `db.drop_all()` in init_db.py.
+"""
+from sqlalchemy import inspect, text
+
+# Values for columns added to tables that already hold rows
+BACKFILLS = {
+    ('alarm', 'updated_at'): 'UPDATE alarm SET updated_at = created_at',
+    ('study_session', 'updated_at'): 'UPDATE study_session SET updated_at = created_at',
+    ('user', 'session_key'): 'UPDATE "user" SET session_key = lower(hex(randomblob(16)))',
+}
+
+
+def _add_column_sql(table, column, dialect):
+    column_type = column.type.compile(dialect=dialect)
+    # SQLite cannot add a NOT NULL column without a constant default, so
+    # columns are added nullable; the ORM default fills them for new rows.
+    return f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'
+
+
+def upgrade(db):
+    """Apply missing tables, columns and indexes; return what was changed."""
+    engine = db.engine
+    applied = []
+
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            table.create(engine)
+            applied.append(f"table {table.name}")
+
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in columns:
+                    conn.execute(text(_add_column_sql(table, column, engine.dialect)))
+                    if (table.name, column.name) in BACKFILLS:
+                        conn.execute(text(BACKFILLS[(table.name, column.name)]))
+                    applied.append(f"column {table.name}.{column.name}")
+
+            indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(conn)
+                    applied.append(f"index {index.name}")
+
+    return applied
@@ -0,0 +1,143 @@
+import secrets
+from datetime import datetime
+
+from flask_sqlalchemy import SQLAlchemy
+
+from routing import RoutingSession
+
+# Bound to an app by create_app(); importing this module opens no
+# connection and issues no DDL. Read-only views may route their SELECTs
+# to a second engine (routing.py)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+
+def new_session_key():
+    return secrets.token_hex(16)
+
+# User model for login/register
+class User(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(150), unique=True, nullable=False)
+    password = db.Column(db.String(255), nullable=False)  # werkzeug hash (legacy rows: plaintext)
+    # Copied into the session at login and checked on every request, so
+    # replacing it (or deleting the account) ends all of its sessions
+    session_key = db.Column(db.String(32), default=new_session_key)
+
+    # Ids of deleted accounts are never handed out again
+    __table_args__ = {'sqlite_autoincrement': True}
+
+# Alarm model to store alarms
+class Alarm(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+    alarm_time = db.Column(db.String(5), nullable=False)  # Format: HH:MM
+    repeat_type = db.Column(db.String(20), nullable=False, default='once')  # once, daily, weekdays, weekends
+    sound_type = db.Column(db.String(20), nullable=False, default='bell')  # bell, chime, digital, voice
+    volume = db.Column(db.Integer, nullable=False, default=80)  # 0-100
+    is_active = db.Column(db.Boolean, nullable=False, default=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    deleted_at = db.Column(db.DateTime)  # tombstone for delta sync
+    change_seq = db.Column(db.Integer)  # numbered by triggers on every write (changes.py)
+
+    __table_args__ = (
+        # Alarm lists and the active-alarm counter filter on these
+        db.Index('ix_alarm_user_active', 'user_id', 'is_active'),
+        # Delta sync and ETags
+        db.Index('ix_alarm_user_change', 'user_id', 'change_seq'),
+        # Cross-worker change feed
+        db.Index('ix_alarm_change', 'change_seq'),
+    )
+
+# Append-only log of what happened to an alarm on a client
+class AlarmEvent(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    alarm_id = db.Column(db.Integer, db.ForeignKey('alarm.id'), nullable=False)
+    action = db.Column(db.String(20), nullable=False)  # fired, snoozed, dismissed
+    occurred_at = db.Column(db.DateTime, nullable=False)  # UTC, as reported by the client
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_alarm_event_user_occurred', 'user_id', 'occurred_at'),
+        db.Index('ix_alarm_event_alarm_occurred', 'alarm_id', 'occurred_at'),
+    )
+
+# Study session model
+class StudySession(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    subject = db.Column(db.String(100), nullable=False)
+    start_time = db.Column(db.DateTime, nullable=False)
+    duration = db.Column(db.Integer, nullable=False)  # in minutes
+    status = db.Column(db.String(20), nullable=False, default='upcoming')  # upcoming, active, completed
+    notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    deleted_at = db.Column(db.DateTime)  # tombstone for delta sync
+    book_id = db.Column(db.Integer, db.ForeignKey('book.id'), nullable=True)
+    change_seq = db.Column(db.Integer)  # numbered by triggers on every write (changes.py)
+
+    __table_args__ = (
+        # Per-user day ranges (dashboard counters, session lists)
+        db.Index('ix_study_session_user_start', 'user_id', 'start_time', 'status'),
+        # Per-user status lookups (book_view's active sessions)
+        db.Index('ix_study_session_user_status', 'user_id', 'status'),
+        # Next status transition for the session status worker
+        db.Index('ix_study_session_status_start', 'status', 'start_time'),
+        # A book's most recent sessions
+        db.Index('ix_study_session_book_start', 'book_id', 'start_time'),
+        # Delta sync and ETags
+        db.Index('ix_study_session_user_change', 'user_id', 'change_seq'),
+        # Cross-worker change feed
+        db.Index('ix_study_session_change', 'change_seq'),
+    )
+
+# Completed sessions older than ARCHIVE_AFTER_DAYS, moved out of
+# study_session by archive.py with their ids; read-only from then on
+class StudySessionArchive(db.Model):
+    __tablename__ = 'study_session_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    subject = db.Column(db.String(100), nullable=False)
+    start_time = db.Column(db.DateTime, nullable=False)
+    duration = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
+    deleted_at = db.Column(db.DateTime)  # always NULL; kept so unions line up
+    book_id = db.Column(db.Integer, db.ForeignKey('book.id'), nullable=True)
+    change_seq = db.Column(db.Integer)  # copied; the archive is never written again
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_study_session_archive_user_start', 'user_id', 'start_time'),
+        db.Index('ix_study_session_archive_book_start', 'book_id', 'start_time'),
+    )
+
+# Completed study time per user and day, kept current by rollups.py.
+# kind is 'total' (key ''), 'subject' (key = subject) or 'book' (key = book id)
+class StudyRollup(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    kind = db.Column(db.String(10), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    key = db.Column(db.String(100), primary_key=True, default='')
+    minutes = db.Column(db.Integer, nullable=False, default=0)
+    sessions = db.Column(db.Integer, nullable=False, default=0)
+
+# Book model for library management
+class Book(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(200), nullable=False)
+    author = db.Column(db.String(100), nullable=False)
+    category = db.Column(db.String(50), nullable=False)
+    description = db.Column(db.Text)
+    cover_image = db.Column(db.String(200))  # URL or path to book cover
+    status = db.Column(db.String(20), default='available')  # available, borrowed
+    total_pages = db.Column(db.Integer)
+    current_page = db.Column(db.Integer, default=0)
+    reading_progress = db.Column(db.Float, default=0.0)  # percentage
+    study_sessions = db.relationship('StudySession', backref='book', lazy=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,107 @@
+"""Salted password hashes, computed off the request threads.
+
+Hashes are werkzeug's `method$salt$hash` strings; the method (e.g.
+`scrypt:32768:8:1` or `pbkdf2:sha256:600000`) sets the cost and is stored
+in every hash, so raising it upgrades users one login at a time. Rows
+written before hashing hold the plaintext password; they still verify
+and are replaced by a hash on their next successful login.
+"""
+import hmac
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# Prefixes of the hash methods werkzeug generates
+HASH_PREFIXES = ('scrypt:', 'pbkdf2:')
+
+
+class HasherBusy(Exception):
+    """More hashing work is queued than the pool accepts."""
+
+
+def is_hashed(stored):
+    return stored.startswith(HASH_PREFIXES) and stored.count('$') == 2
+
+
+def hash_password(password, method=None):
+    """Hash in the calling thread (scripts, seeding)."""
+    return generate_password_hash(password, method or current_app.config['PASSWORD_HASH_METHOD'])
+
+
+def _verify(stored, password):
+    if is_hashed(stored):
+        return check_password_hash(stored, password)
+    return hmac.compare_digest(stored.encode(), password.encode())
+
+
+class PasswordHasher:
+    """Bounded pool for password hashing and checking.
+
+    scrypt and PBKDF2 release the GIL, so at most `max_workers` cores hash
+    at once while request threads serving other routes keep running. At
+    most `max_pending` calls wait for the pool; further callers wait up to
+    `queue_timeout` seconds for room and then get HasherBusy, so a burst
+    of logins cannot queue unbounded work.
+    """
+
+    def __init__(self, method='scrypt:32768:8:1', max_workers=2, max_pending=8, queue_timeout=2.0):
+        self.method = method
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+        self._dummy_hash = None
+        self.calls = 0
+        self.rejected = 0
+
+    def _submit(self, fn, *args):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='password-hash')
+                self._slots = threading.BoundedSemaphore(self.max_pending)
+            executor, slots = self._executor, self._slots
+        if not slots.acquire(timeout=self.queue_timeout):
+            self.rejected += 1
+            raise HasherBusy()
+        self.calls += 1
+        try:
+            future = executor.submit(fn, *args)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        return future.result()
+
+    def hash(self, password):
+        return self._submit(generate_password_hash, password, self.method)
+
+    def _reference_hash(self):
+        # A hash of '' under the current method: checked in place of a
+        # missing user's, and its prefix is the full method string (werkzeug
+        # fills in defaults, e.g. `pbkdf2:sha256` -> `pbkdf2:sha256:600000`)
+        if self._dummy_hash is None or not self._dummy_hash.startswith(self.method):
+            self._dummy_hash = self._submit(generate_password_hash, '', self.method)
+        return self._dummy_hash
+
+    def verify(self, stored, password):
+        """(matches, needs_rehash) for a stored hash or legacy plaintext.
+
+        `stored` None (no such user) is checked against a throwaway hash,
+        so unknown usernames take as long as wrong passwords.
+        """
+        reference = self._reference_hash()
+        if stored is None:
+            self._submit(check_password_hash, reference, password)
+            return False, False
+        matches = self._submit(_verify, stored, password)
+        return matches, matches and stored.split('$', 1)[0] != reference.split('$', 1)[0]
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
@@ -0,0 +1,107 @@
+"""Calendar view of a user's alarms and study sessions.
+
+Recurring alarms are expanded into concrete occurrences with the same
+rules the scheduler fires them by, then merged with session intervals in
+one pass that flags overlapping sessions and the breaks between them.
+"""
+import heapq
+from datetime import datetime, timedelta, timezone
+
+from scheduler import next_occurrence
+
+# Breaks between two sessions shorter than this are flagged
+MIN_BREAK_MINUTES = 5
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def utc_to_local(value):
+    """Naive UTC (the created_at columns) as naive local time, like alarm times."""
+    return value.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def alarm_occurrences(alarm_time, repeat_type, start, end, not_before=None):
+    """Fire times of an alarm in [start, end)."""
+    after = max(start, not_before or start) - timedelta(microseconds=1)
+    occurrences = []
+    while True:
+        after = next_occurrence(alarm_time, repeat_type, after)
+        if after >= end:
+            return occurrences
+        occurrences.append(after)
+        if repeat_type == 'once':
+            return occurrences
+
+
+def week_items(week, alarms, sessions, now):
+    """Unflagged calendar items for the week starting on date `week`, by start time.
+
+    `alarms` are active alarm rows and `sessions` the live sessions starting
+    in that week, all in local time. A one-off alarm only rings at its next
+    occurrence, and a recurring one not before it was created.
+    """
+    start = datetime.combine(week, datetime.min.time())
+    end = start + timedelta(days=7)
+    items = []
+    for alarm in alarms:
+        not_before = now if alarm.repeat_type == 'once' else utc_to_local(alarm.created_at)
+        for fire_at in alarm_occurrences(alarm.alarm_time, alarm.repeat_type, start, end, not_before):
+            items.append({
+                'type': 'alarm',
+                'id': alarm.id,
+                'name': alarm.name,
+                'start': fire_at,
+                'repeat_type': alarm.repeat_type,
+                'sound_type': alarm.sound_type
+            })
+    for study_session in sessions:
+        items.append({
+            'type': 'session',
+            'id': study_session.id,
+            'subject': study_session.subject,
+            'start': study_session.start_time,
+            'end': study_session.start_time + timedelta(minutes=study_session.duration),
+            'duration': study_session.duration,
+            'status': study_session.status
+        })
+    items.sort(key=lambda item: (item['start'], item['type'] != 'session', item['id']))
+    return items
+
+
+def sweep(items):
+    """Serialize sorted items, flagging overlaps and inserting break gaps.
+
+    Sessions still running when another starts overlap it; the time between
+    one session ending and the next starting on the same day is a gap item.
+    """
+    result = []
+    running = []        # heap of (end, index into result) for open sessions
+    latest_end = None   # end of the latest-ending session so far
+    for item in items:
+        item = dict(item)
+        if item['type'] == 'session':
+            while running and running[0][0] <= item['start']:
+                heapq.heappop(running)
+            item['overlaps'] = [result[index]['id'] for _, index in running]
+            for _, index in running:
+                result[index]['overlaps'].append(item['id'])
+
+            if latest_end is not None and latest_end < item['start'] \
+                    and latest_end.date() == item['start'].date():
+                minutes = int((item['start'] - latest_end).total_seconds() // 60)
+                result.append({
+                    'type': 'gap',
+                    'start': latest_end.strftime(TIME_FORMAT),
+                    'end': item['start'].strftime(TIME_FORMAT),
+                    'minutes': minutes,
+                    'short': minutes < MIN_BREAK_MINUTES
+                })
+            latest_end = item['end'] if latest_end is None else max(latest_end, item['end'])
+            heapq.heappush(running, (item['end'], len(result)))
+            item['end'] = item['end'].strftime(TIME_FORMAT)
+        item['start'] = item['start'].strftime(TIME_FORMAT)
+        result.append(item)
+    return result
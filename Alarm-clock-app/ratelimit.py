@@ -0,0 +1,44 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenBucketLimiter:
+    """In-memory token buckets, one per key (a client IP, a username).
+
+    Each bucket holds up to `burst` tokens and refills at `per_minute`
+    tokens a minute; a request spends one. At most `max_keys` buckets are
+    kept, least recently used evicted first, so a flood of distinct keys
+    cannot grow memory; an evicted key starts again with a full bucket.
+    Limits are per process: with several workers a client gets each
+    worker's allowance.
+    """
+
+    def __init__(self, per_minute=10, burst=20, max_keys=100000):
+        self.per_minute = per_minute
+        self.burst = burst
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()   # key -> (tokens, updated_at)
+        self.limited = 0
+
+    def allow(self, key):
+        """Spend a token for `key`; (True, 0) or (False, seconds until one is free)."""
+        rate = self.per_minute / 60.0
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated_at) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            else:
+                self.limited += 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
@@ -6,7 +6,12 @@ PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '.'))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-from app import app, db, User
+from app import create_app
+from models import db, User
+from passwords import hash_password
+from session_store import SQLiteSessionStore
+
+app = create_app()
 
 def create_my_account(email, password):
     with app.app_context():
@@ -14,11 +19,18 @@ def create_my_account(email, password):
         existing = User.query.filter_by(username=email).first()
         if existing:
             print(f'Deleting old account for {email}')
+            old_id = existing.id
             db.session.delete(existing)
             db.session.commit()
+            # Its sessions stop working once the row (and its session key)
+            # is gone; also drop them from the on-disk store production
+            # workers share, to free the rows
+            store_path = app.config['SESSION_STORE_PATH'] or os.path.join(app.instance_path, 'sessions.db')
+            if os.path.exists(store_path):
+                SQLiteSessionStore(store_path).delete_user(old_id)
         
         # Create new user
-        user = User(username=email, password=password)
+        user = User(username=email, password=hash_password(password))
         db.session.add(user)
         db.session.commit()
         print(f'Created new account:')
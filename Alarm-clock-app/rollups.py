@@ -0,0 +1,119 @@
+"""Daily study totals per user, updated with every study-session write.
+
+Only completed, non-deleted sessions count. A session contributes its
+duration and a session count to three rows for its start day: the
+user's total, its subject and (if linked) its book. A write is applied
+as the difference between the session's contribution before and after
+it, so no rollup row is ever recomputed from raw sessions except by
+`rebuild()`.
+
+The "before" state is always read from the database inside the writing
+transaction (`locked_states()`), never from an ORM object loaded
+earlier: the status worker may have completed the session in between,
+and its change is already counted.
+"""
+import time
+
+import click
+from sqlalchemy.dialects.sqlite import insert
+
+from archive import session_union
+from models import db, StudyRollup, StudySession
+
+# Columns that decide what a session contributes
+ROLLUP_FIELDS = ('user_id', 'start_time', 'duration', 'status', 'subject', 'book_id', 'deleted_at')
+
+
+def contributions(state):
+    """(rollup key, minutes) pairs for one session state dict, or none."""
+    if state is None or state.get('status') != 'completed' or state.get('deleted_at') is not None:
+        return []
+    user_id, day = state['user_id'], state['start_time'].date()
+    keys = [(user_id, 'total', day, ''), (user_id, 'subject', day, state['subject'])]
+    if state.get('book_id') is not None:
+        keys.append((user_id, 'book', day, str(state['book_id'])))
+    return [(key, state['duration']) for key in keys]
+
+
+def session_state(study_session):
+    """ROLLUP_FIELDS of an ORM StudySession."""
+    return {field: getattr(study_session, field) for field in ROLLUP_FIELDS}
+
+
+def pending_changes(study_session):
+    """The ROLLUP_FIELDS a flush of `study_session` writes, with their new values."""
+    attrs = db.inspect(study_session).attrs
+    return {field: getattr(study_session, field)
+            for field in ROLLUP_FIELDS if attrs[field].history.has_changes()}
+
+
+def locked_states(session, ids):
+    """ROLLUP_FIELDS of the given sessions as stored, by id, under the write lock.
+
+    A no-op UPDATE ... RETURNING opens the write transaction and reads the
+    rows in one statement, so no other thread or process can change them
+    before this transaction ends.
+    """
+    if not ids:
+        return {}
+    table = StudySession.__table__
+    rows = session.execute(
+        db.update(table).where(table.c.id.in_(ids))
+        .values(updated_at=table.c.updated_at)
+        .returning(table.c.id, *(table.c[field] for field in ROLLUP_FIELDS))
+    ).all()
+    return {row.id: {field: getattr(row, field) for field in ROLLUP_FIELDS} for row in rows}
+
+
+def apply_changes(connection, changes):
+    """Apply (before, after) session states as one upsert per touched row."""
+    deltas = {}
+    for before, after in changes:
+        for sign, state in ((-1, before), (1, after)):
+            for key, minutes in contributions(state):
+                delta = deltas.setdefault(key, [0, 0])
+                delta[0] += sign * minutes
+                delta[1] += sign
+    rows = [{'user_id': user_id, 'kind': kind, 'day': day, 'key': key,
+             'minutes': minutes, 'sessions': sessions}
+            for (user_id, kind, day, key), (minutes, sessions) in deltas.items() if minutes or sessions]
+    if not rows:
+        return
+    stmt = insert(StudyRollup)
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=['user_id', 'kind', 'day', 'key'],
+        set_={'minutes': StudyRollup.minutes + stmt.excluded.minutes,
+              'sessions': StudyRollup.sessions + stmt.excluded.sessions}
+    ), rows)
+
+
+def rebuild():
+    """Recompute every rollup row from study_session and its archive; return the row count."""
+    sessions = session_union(
+        'user_id', 'start_time', 'duration', 'subject', 'book_id',
+        where=lambda model: db.and_(model.status == 'completed', model.deleted_at.is_(None))
+    ).subquery()
+    day = db.func.date(sessions.c.start_time)
+    columns = ['user_id', 'kind', 'day', 'key', 'minutes', 'sessions']
+    db.session.execute(db.delete(StudyRollup))
+    for kind, key in (('total', db.literal('')),
+                      ('subject', sessions.c.subject),
+                      ('book', db.cast(sessions.c.book_id, db.String))):
+        query = db.select(
+            sessions.c.user_id, db.literal(kind), day, key,
+            db.func.sum(sessions.c.duration), db.func.count()
+        ).group_by(sessions.c.user_id, day, key)
+        if kind == 'book':
+            query = query.where(sessions.c.book_id.isnot(None))
+        db.session.execute(db.insert(StudyRollup).from_select(columns, query))
+    db.session.commit()
+    return db.session.query(db.func.count()).select_from(StudyRollup).scalar()
+
+
+@click.command('backfill-rollups')
+def backfill_rollups_command():
+    """Rebuild the daily study rollups from existing study sessions."""
+    db.create_all()
+    start = time.perf_counter()
+    count = rebuild()
+    click.echo(f'study_rollup: {count} rows ({time.perf_counter() - start:.1f} s)')
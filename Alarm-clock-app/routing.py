@@ -0,0 +1,91 @@
+"""Read-only routing of chosen views to a separate SQLite connection pool.
+
+Views marked read-only run their SELECTs on a second engine that opens
+the same database file with `mode=ro`. With WAL a read-only connection
+sees every commit as soon as its next statement starts, and it never
+takes a pool slot from, or queues behind, a writer. Anything else
+(flushes, INSERT/UPDATE/DELETE, raw connections) goes to the primary
+engine.
+
+A client that committed a write in the last READ_YOUR_WRITES_SECONDS
+stays on the primary, so a replica that lags (e.g. a copy made with the
+backup API instead of `mode=ro`) never hides its own changes.
+"""
+import time
+
+from flask import current_app, has_request_context, session as client_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+
+from sqlite_tuning import READ_ONLY_PRAGMAS, apply_pragmas
+
+
+class RoutingSession(Session):
+    """db.session class: SELECTs go to `info['replica']` when a view set it."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = self.info.get('replica')
+        if (replica is not None and bind is None and not self._flushing
+                and not self.info.get('wrote') and _is_read(clause)):
+            return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _is_read(clause):
+    if clause is None:
+        return False
+    if getattr(clause, 'is_select', False):
+        return True
+    # text() statements (the book search)
+    text = getattr(clause, 'text', None)
+    return isinstance(text, str) and text.lstrip()[:6].upper() == 'SELECT'
+
+
+def create_replica_engine(primary, options):
+    """A read-only engine on the primary's SQLite file, or None if it has none."""
+    url = primary.url
+    if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:'):
+        return None
+    path = url.database[5:] if url.query.get('uri') else url.database
+    engine = create_engine(make_url(f'sqlite:///file:{path}?mode=ro&uri=true'), **options)
+    apply_pragmas(engine, READ_ONLY_PRAGMAS)
+    return engine
+
+
+def use_replica(db_session):
+    """Route this request's reads to the replica, unless the client just wrote."""
+    replica = current_app.extensions.get('read_replica')
+    if replica is None:
+        return
+    wrote_at = client_session.get('wrote_at')
+    if wrote_at and time.time() - wrote_at < current_app.config['READ_YOUR_WRITES_SECONDS']:
+        return
+    db_session.info['replica'] = replica
+
+
+def _note_flush(session, flush_context):
+    session.info['wrote'] = True
+
+
+def _note_statement(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info['wrote'] = True
+
+
+def _remember_write(session):
+    # `wrote` stays set for the rest of the request, so later reads see the
+    # write too. The cookie is only re-signed once the stamp is half a
+    # window old: every write still gets at least half the window on the
+    # primary, without a Set-Cookie on each write of a busy client
+    if not (session.info.get('wrote') and has_request_context()):
+        return
+    now = time.time()
+    if now - client_session.get('wrote_at', 0) >= current_app.config['READ_YOUR_WRITES_SECONDS'] / 2:
+        client_session['wrote_at'] = now
+
+
+def install(session_target):
+    event.listen(session_target, 'after_flush', _note_flush)
+    event.listen(session_target, 'do_orm_execute', _note_statement)
+    event.listen(session_target, 'after_commit', _remember_write)
@@ -1,5 +1,90 @@
-from app import app
+import argparse
+import asyncio
+import logging
+import os
+
+
+def run_streams(host, port):
+    # One event loop holds every stream, so the cap is about file
+    # descriptors (ulimit -n), not threads
+    os.environ.setdefault('SSE_MAX_STREAMS', '10000')
+    os.environ.setdefault('DB_POOL_SIZE', '8')
+
+    from app import create_app, current_user, event_broker, start_alarm_scheduler
+    from stream_server import StreamServer
+
+    logging.basicConfig(level=logging.INFO)
+    app = create_app('production')
+    # No Flask request ever starts the background workers here; this
+    # process needs the scheduler and change feed to have events to send
+    with app.app_context():
+        start_alarm_scheduler()
+
+    def load_user():
+        user = current_user()
+        return user.id if user else None
+
+    server = StreamServer(app, event_broker, load_user, heartbeat=app.config['SSE_HEARTBEAT_SECONDS'])
+    asyncio.run(server.serve(host, port))
+
+
+def run_production(host, port, workers, threads):
+    # Each worker gets a pool sized for its request threads plus the
+    # scheduler/change-feed threads
+    os.environ.setdefault('DB_POOL_SIZE', str(threads + 2))
+
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise SystemExit('Production mode needs gunicorn: pip install -r requirements.txt')
+
+    from app import create_app
+    from models import db
+
+    app = create_app('production')
+
+    def post_fork(server, worker):
+        # Connections opened in the master must not be shared across forks
+        with app.app_context():
+            db.engine.dispose(close=False)
+            if 'read_replica' in app.extensions:
+                app.extensions['read_replica'].dispose(close=False)
+
+    class ProductionServer(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f'{host}:{port}')
+            self.cfg.set('workers', workers)
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('threads', threads)
+            self.cfg.set('timeout', 120)
+            self.cfg.set('post_fork', post_fork)
+
+        def load(self):
+            return app
+
+    ProductionServer().run()
+
 
 if __name__ == '__main__':
-    # Run app without the reloader to avoid multiple processes touching the SQLite DB
-    app.run(debug=True, use_reloader=False)
+    parser = argparse.ArgumentParser(description='Run the Break Time Alarm app')
+    parser.add_argument('--production', action='store_true',
+                        help='serve with several worker processes (needs gunicorn)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--threads', type=int, default=8, help='request threads per worker')
+    parser.add_argument('--streams', action='store_true',
+                        help='with --production: serve only /api/events, every stream on one '
+                             'event loop (put it behind the same reverse proxy)')
+    args = parser.parse_args()
+
+    if args.production and args.streams:
+        run_streams(args.host, args.port)
+    elif args.production:
+        run_production(args.host, args.port, args.workers, args.threads)
+    else:
+        from app import create_app
+
+        app = create_app()
+        # Run app without the reloader to avoid multiple processes touching the SQLite DB
+        app.run(debug=True, use_reloader=False, host=args.host, port=args.port)
@@ -0,0 +1,273 @@
+import heapq
+import itertools
+import logging
+import threading
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Weekdays (Monday=0 .. Sunday=6) on which each repeat type may fire.
+# Mirrors checkRepeatCondition() in static/js/home.js.
+REPEAT_DAYS = {
+    'once': frozenset(range(7)),
+    'daily': frozenset(range(7)),
+    'weekdays': frozenset(range(0, 5)),
+    'weekends': frozenset((5, 6)),
+}
+
+
+def next_occurrence(alarm_time, repeat_type, after):
+    """Return the first time strictly after `after` at which the alarm fires."""
+    hour, minute = (int(part) for part in alarm_time.split(':'))
+    days = REPEAT_DAYS.get(repeat_type, REPEAT_DAYS['daily'])
+
+    candidate = after.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if candidate <= after:
+        candidate += timedelta(days=1)
+    while candidate.weekday() not in days:
+        candidate += timedelta(days=1)
+    return candidate
+
+
+class ScheduledAlarm:
+    __slots__ = ('fire_at', 'seq', 'alarm_id', 'user_id', 'alarm_time', 'repeat_type', 'valid')
+
+    def __init__(self, fire_at, seq, alarm_id, user_id, alarm_time, repeat_type):
+        self.fire_at = fire_at
+        self.seq = seq
+        self.alarm_id = alarm_id
+        self.user_id = user_id
+        self.alarm_time = alarm_time
+        self.repeat_type = repeat_type
+        self.valid = True
+
+    def __lt__(self, other):
+        return (self.fire_at, self.seq) < (other.fire_at, other.seq)
+
+
+class AlarmScheduler:
+    """Keeps the next occurrence of every active alarm in a min-heap.
+
+    Updates and removals are O(log n): a replaced entry is only flagged as
+    invalid and skipped once it reaches the top of the heap. A single
+    background thread sleeps until the earliest fire time and calls
+    `on_fire(entry)` for each alarm that is due.
+    """
+
+    def __init__(self, on_fire=None, clock=datetime.now):
+        self.on_fire = on_fire
+        self.clock = clock
+        self._heap = []
+        self._entries = {}   # alarm_id -> live ScheduledAlarm
+        self._by_user = {}   # user_id -> set of alarm ids
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._running = False
+
+    @property
+    def running(self):
+        return self._running
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _make_entry(self, alarm_id, user_id, alarm_time, repeat_type, after):
+        """A ScheduledAlarm, or None (logged) if `alarm_time` is not HH:MM."""
+        try:
+            fire_at = next_occurrence(alarm_time, repeat_type, after)
+        except (AttributeError, TypeError, ValueError):
+            logger.warning('Not scheduling alarm %s: unparseable alarm_time %r', alarm_id, alarm_time)
+            return None
+        return ScheduledAlarm(fire_at, next(self._seq), alarm_id, user_id, alarm_time, repeat_type)
+
+    def _discard(self, alarm_id):
+        entry = self._entries.pop(alarm_id, None)
+        if entry is None:
+            return
+        entry.valid = False
+        user_alarms = self._by_user.get(entry.user_id)
+        if user_alarms is not None:
+            user_alarms.discard(alarm_id)
+            if not user_alarms:
+                del self._by_user[entry.user_id]
+
+    def _push(self, entry):
+        self._entries[entry.alarm_id] = entry
+        self._by_user.setdefault(entry.user_id, set()).add(entry.alarm_id)
+        heapq.heappush(self._heap, entry)
+
+    def _compact(self):
+        # Rebuild once stale entries outnumber live ones so the heap stays O(n)
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [entry for entry in self._heap if entry.valid]
+            heapq.heapify(self._heap)
+
+    def load(self, alarms):
+        """Replace the schedule with `alarms`, an iterable of
+        (alarm_id, user_id, alarm_time, repeat_type) tuples; rows that
+        cannot be parsed are skipped."""
+        now = self.clock()
+        with self._cond:
+            self._heap = []
+            self._entries = {}
+            self._by_user = {}
+            for alarm_id, user_id, alarm_time, repeat_type in alarms:
+                entry = self._make_entry(alarm_id, user_id, alarm_time, repeat_type, now)
+                if entry is None:
+                    continue
+                self._entries[alarm_id] = entry
+                self._by_user.setdefault(user_id, set()).add(alarm_id)
+                self._heap.append(entry)
+            heapq.heapify(self._heap)
+            self._cond.notify()
+
+    def schedule(self, alarm_id, user_id, alarm_time, repeat_type, is_active=True):
+        """Insert or reschedule an alarm; inactive alarms are removed."""
+        with self._cond:
+            self._discard(alarm_id)
+            entry = is_active and self._make_entry(alarm_id, user_id, alarm_time, repeat_type, self.clock())
+            if entry:
+                self._push(entry)
+            self._compact()
+            self._cond.notify()
+
+    def remove(self, alarm_id):
+        with self._cond:
+            self._discard(alarm_id)
+            self._compact()
+            self._cond.notify()
+
+    def next_for_user(self, user_id):
+        """Return the user's earliest upcoming ScheduledAlarm, or None."""
+        with self._cond:
+            alarm_ids = self._by_user.get(user_id)
+            if not alarm_ids:
+                return None
+            return min(self._entries[alarm_id] for alarm_id in alarm_ids)
+
+    def start(self, load=None):
+        """Start the timer thread; `load` is called once to seed the heap.
+
+        If `load` raises, the scheduler stays stopped and the next call
+        tries again.
+        """
+        with self._start_lock:
+            if self._running:
+                return
+            if load is not None:
+                self.load(load())
+            with self._cond:
+                self._running = True
+            self._thread = threading.Thread(target=self._run, name='alarm-scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _pop_due(self):
+        """Wait until the earliest alarm is due and pop it; None on stop."""
+        with self._cond:
+            while self._running:
+                while self._heap and not self._heap[0].valid:
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                delay = (self._heap[0].fire_at - self.clock()).total_seconds()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                entry = heapq.heappop(self._heap)
+                self._discard(entry.alarm_id)
+                if entry.repeat_type != 'once':
+                    self._push(self._make_entry(entry.alarm_id, entry.user_id, entry.alarm_time,
+                                                entry.repeat_type, entry.fire_at))
+                return entry
+        return None
+
+    def _run(self):
+        while True:
+            entry = self._pop_due()
+            if entry is None:
+                return
+            if self.on_fire is not None:
+                try:
+                    self.on_fire(entry)
+                except Exception:
+                    logger.exception('Error firing alarm %s', entry.alarm_id)
+
+
+class TransitionWorker:
+    """Runs `step()` each time the next transition it reported comes due.
+
+    `step()` applies whatever is due and returns the datetime at which it
+    next has work (None if nothing is pending). The thread sleeps until
+    then, at most `max_sleep` seconds, or until `wake(at)` reports a write
+    whose transitions start at `at`, earlier than the one it is waiting for.
+    """
+
+    def __init__(self, step=None, name='transition-worker', clock=datetime.now,
+                 max_sleep=300, retry_seconds=5):
+        self.step = step
+        self.name = name
+        self.clock = clock
+        self.max_sleep = max_sleep
+        self.retry_seconds = retry_seconds
+        self._cond = threading.Condition()
+        self._woken = False
+        self._thread = None
+        self._running = False
+        self.next_at = None
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def wake(self, at=None):
+        # Writes made by step() itself, or due after the transition already
+        # waited for, need no extra run: step() looks again at that point
+        if threading.current_thread() is self._thread:
+            return
+        if at is not None and self.next_at is not None and at >= self.next_at:
+            return
+        with self._cond:
+            self._woken = True
+            self._cond.notify()
+
+    def _run(self):
+        while self._running:
+            try:
+                self.next_at = self.step()
+                delay = (self.max_sleep if self.next_at is None
+                         else (self.next_at - self.clock()).total_seconds())
+            except Exception:
+                logger.exception('Error in %s', self.name)
+                self.next_at = None
+                delay = self.retry_seconds
+            with self._cond:
+                if not self._woken and self._running and delay > 0:
+                    self._cond.wait(min(delay, self.max_sleep))
+                self._woken = False
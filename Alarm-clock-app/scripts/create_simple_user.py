@@ -6,7 +6,11 @@ PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-from app import app, db, User
+from app import create_app
+from models import db, User
+from passwords import hash_password
+
+app = create_app()
 
 def create_user(username: str, password: str):
     with app.app_context():
@@ -14,7 +18,7 @@ def create_user(username: str, password: str):
         if existing_user:
             print(f'User {username} already exists')
             return False
-        new_user = User(username=username, password=password)
+        new_user = User(username=username, password=hash_password(password))
         db.session.add(new_user)
         db.session.commit()
         print(f'Created new user: {username}')
@@ -0,0 +1,116 @@
+"""Full-text search over the book catalog (SQLite FTS5).
+
+`book_fts` is an external-content FTS5 index of book.title, author,
+category and description: it stores only the index and reads the text
+back from `book`. Triggers on `book` keep it in step with every write,
+ORM or bulk, in the same transaction. The index and triggers are created
+with the `book` table (db.create_all) or by `flask --app app migrate` on
+an existing database.
+"""
+import re
+
+from sqlalchemy import event, text
+
+from models import Book
+
+INDEX = 'book_fts'
+COLUMNS = ('title', 'author', 'category', 'description')
+# bm25 weight per column, in COLUMNS order: a title hit outranks a description hit
+WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+# A lone one-letter prefix matches most of the catalog; wait for more input
+MIN_PREFIX = 2
+
+_columns = ', '.join(COLUMNS)
+_new = ', '.join(f'new.{column}' for column in COLUMNS)
+_old = ', '.join(f'old.{column}' for column in COLUMNS)
+
+DDL = [
+    # prefix='2 3' keeps extra indexes of 2- and 3-character term prefixes,
+    # so short autocomplete prefixes do not walk the whole term list
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {INDEX} USING fts5({_columns}, content='book', "
+    f"content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    f"CREATE TRIGGER IF NOT EXISTS {INDEX}_insert AFTER INSERT ON book BEGIN "
+    f"INSERT INTO {INDEX}(rowid, {_columns}) VALUES (new.id, {_new}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {INDEX}_delete AFTER DELETE ON book BEGIN "
+    f"INSERT INTO {INDEX}({INDEX}, rowid, {_columns}) VALUES ('delete', old.id, {_old}); END",
+    # Progress and status updates do not touch the indexed columns
+    f"CREATE TRIGGER IF NOT EXISTS {INDEX}_update AFTER UPDATE OF {_columns} ON book BEGIN "
+    f"INSERT INTO {INDEX}({INDEX}, rowid, {_columns}) VALUES ('delete', old.id, {_old}); "
+    f"INSERT INTO {INDEX}(rowid, {_columns}) VALUES (new.id, {_new}); END",
+]
+
+
+def create_index(connection):
+    """Create the index and triggers if missing; True if the index was new."""
+    if connection.dialect.name != 'sqlite':
+        return False
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': INDEX}
+    ).first() is not None
+    for statement in DDL:
+        connection.execute(text(statement))
+    if not exists:
+        rebuild(connection)
+    return not exists
+
+
+def rebuild(connection):
+    """Re-index every book from scratch."""
+    connection.execute(text(f"INSERT INTO {INDEX}({INDEX}) VALUES ('rebuild')"))
+
+
+def _after_create_book(target, connection, **kw):
+    create_index(connection)
+
+
+def _before_drop_book(target, connection, **kw):
+    # The index would otherwise outlive init_db's drop_all and its triggers
+    if connection.dialect.name == 'sqlite':
+        connection.execute(text(f'DROP TABLE IF EXISTS {INDEX}'))
+
+
+event.listen(Book.__table__, 'after_create', _after_create_book)
+event.listen(Book.__table__, 'before_drop', _before_drop_book)
+
+
+def _terms(value):
+    return re.findall(r'\w+', value.lower())
+
+
+def match_query(query):
+    """FTS5 MATCH expression for user input, or None if it has no terms.
+
+    Every word must match; the last one as a prefix, since it is usually
+    still being typed. Words are quoted, so FTS5 operators and column
+    filters typed by the user are searched for as plain text.
+    """
+    terms = _terms(query)
+    if not terms or (len(terms) == 1 and len(terms[0]) < MIN_PREFIX):
+        return None
+    return ' '.join(f'"{term}"' for term in terms) + '*'
+
+
+FIELDS = 'book.id, book.title, book.author, book.category, book.cover_image, book.status'
+
+
+def search_books(session, query, category=None, limit=10):
+    """Best-ranked books matching `query`, optionally in one category."""
+    match = match_query(query)
+    if match is None:
+        return []
+    rank = f"bm25({INDEX}, {', '.join(map(str, WEIGHTS))})"
+    if category:
+        # The column filter narrows what FTS5 has to rank; the exact
+        # comparison on book.category decides
+        if _terms(category):
+            match += f' AND category : ^"{" ".join(_terms(category))}"'
+        sql = (f"SELECT {FIELDS} FROM {INDEX} JOIN book ON book.id = {INDEX}.rowid "
+               f"WHERE {INDEX} MATCH :match AND book.category = :category "
+               f"ORDER BY {rank} LIMIT :limit")
+    else:
+        # Rank and cut inside the index first, so only `limit` book rows are read
+        sql = (f"SELECT {FIELDS} FROM (SELECT rowid, {rank} AS score FROM {INDEX} "
+               f"WHERE {INDEX} MATCH :match ORDER BY score LIMIT :limit) AS hit "
+               f"JOIN book ON book.id = hit.rowid ORDER BY hit.score")
+    params = {'match': match, 'category': category, 'limit': limit}
+    return [dict(row._mapping) for row in session.execute(text(sql), params)]
@@ -0,0 +1,169 @@
+"""Deterministic synthetic data for load testing (`flask --app app seed`)."""
+import random
+import time
+from datetime import datetime, timedelta
+
+import click
+
+import rollups
+from models import db, User, Alarm, StudySession, Book
+from passwords import hash_password
+
+SUBJECTS = ['Mathematics', 'Physics', 'Chemistry', 'Biology', 'History', 'Literature',
+            'Economics', 'Computer Science', 'Philosophy', 'Languages', 'Statistics', 'Law']
+CATEGORIES = ['Science', 'Engineering', 'History', 'Fiction', 'Reference', 'Economics',
+              'Philosophy', 'Languages', 'Law', 'Medicine']
+TITLE_WORDS = ['Introduction', 'Principles', 'Advanced', 'Modern', 'Foundations', 'Theory',
+               'Practice', 'Essentials', 'Handbook', 'Topics', 'Methods', 'Applied']
+AUTHOR_NAMES = ['Smith', 'Nguyen', 'Garcia', 'Chen', 'Sok', 'Patel', 'Kim', 'Dubois',
+                'Okafor', 'Silva', 'Ivanova', 'Tanaka', 'Haddad', 'Novak', 'Mensah']
+ALARM_NAMES = ['Short break', 'Lunch break', 'Stretch', 'Library closing', 'Back to study',
+               'Coffee', 'Review notes']
+REPEAT_TYPES = ['daily', 'weekdays', 'weekends', 'once']
+REPEAT_WEIGHTS = [5, 8, 2, 1]
+SOUND_TYPES = ['bell', 'chime', 'digital', 'voice']
+DURATIONS = [25, 30, 45, 50, 60, 90, 120]
+
+
+def _books(rng, first_id, count, now):
+    for book_id in range(first_id, first_id + count):
+        total_pages = rng.randint(80, 900)
+        current_page = rng.choice([0, 0, rng.randint(1, total_pages), total_pages])
+        subject = rng.choice(SUBJECTS)
+        yield {
+            'id': book_id,
+            'title': f'{rng.choice(TITLE_WORDS)} {subject} {rng.choice(TITLE_WORDS)} {book_id}',
+            'author': f'{rng.choice("ABCDEFGHJKLMNPRST")}. {rng.choice(AUTHOR_NAMES)}',
+            'category': rng.choice(CATEGORIES),
+            'description': f'{rng.choice(TITLE_WORDS)} material on {subject.lower()}.',
+            'status': 'borrowed' if rng.random() < 0.2 else 'available',
+            'total_pages': total_pages,
+            'current_page': current_page,
+            'reading_progress': current_page / total_pages * 100,
+            'created_at': now
+        }
+
+
+def _alarms(rng, user_id, count, now):
+    for _ in range(count):
+        yield {
+            'user_id': user_id,
+            'name': rng.choice(ALARM_NAMES),
+            'alarm_time': f'{rng.randint(7, 21):02d}:{rng.choice((0, 15, 30, 45)):02d}',
+            'repeat_type': rng.choices(REPEAT_TYPES, REPEAT_WEIGHTS)[0],
+            'sound_type': rng.choice(SOUND_TYPES),
+            'volume': rng.randint(4, 10) * 10,
+            'is_active': rng.random() < 0.8,
+            'created_at': now,
+            'updated_at': now
+        }
+
+
+def _sessions(rng, user_id, count, now, months, book_ids):
+    subjects = rng.sample(SUBJECTS, 3)  # each student sticks to a few subjects
+    span_days = months * 30
+    for _ in range(count):
+        day = now - timedelta(days=rng.randint(-7, span_days))
+        start = day.replace(hour=rng.randint(8, 20), minute=rng.choice((0, 15, 30, 45)),
+                            second=0, microsecond=0)
+        duration = rng.choice(DURATIONS)
+        if start + timedelta(minutes=duration) <= now:
+            status = 'completed'
+        elif start <= now:
+            status = 'active'
+        else:
+            status = 'upcoming'
+        yield {
+            'user_id': user_id,
+            'subject': rng.choice(subjects),
+            'start_time': start,
+            'duration': duration,
+            'status': status,
+            'notes': 'Chapter review' if rng.random() < 0.1 else '',
+            'created_at': start - timedelta(days=rng.randint(0, 3)),
+            'updated_at': now,
+            'book_id': rng.choice(book_ids) if book_ids and rng.random() < 0.6 else None
+        }
+
+
+class ChunkedInserter:
+    """Buffers rows per table and writes them as executemany chunks."""
+
+    def __init__(self, chunk_size):
+        self.chunk_size = chunk_size
+        self.pending = {}
+        self.counts = {}
+
+    def add(self, model, row):
+        rows = self.pending.setdefault(model, [])
+        rows.append(row)
+        if len(rows) >= self.chunk_size:
+            self.flush(model)
+
+    def flush(self, model=None):
+        for table_model in ([model] if model is not None else list(self.pending)):
+            rows = self.pending.get(table_model)
+            if rows:
+                db.session.execute(table_model.__table__.insert(), rows)
+                db.session.commit()
+                self.counts[table_model.__tablename__] = self.counts.get(table_model.__tablename__, 0) + len(rows)
+                rows.clear()
+
+
+def seed_database(users, alarms_per_user, sessions_per_user, books, months, seed,
+                  chunk_size=10000, password='password123', progress=None):
+    """Insert synthetic users, alarms, sessions and books; return row counts."""
+    rng = random.Random(seed)
+    # Anchored to midnight so a given seed yields the same rows all day
+    now = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    inserter = ChunkedInserter(chunk_size)
+    # One hash (and salt) for every seeded user; hashing each would
+    # dominate seeding time
+    password_hash = hash_password(password)
+
+    # Explicit ids let sessions reference users and books without read-backs
+    first_user_id = (db.session.query(db.func.max(User.id)).scalar() or 0) + 1
+    first_book_id = (db.session.query(db.func.max(Book.id)).scalar() or 0) + 1
+
+    for row in _books(rng, first_book_id, books, now):
+        inserter.add(Book, row)
+    book_ids = list(range(first_book_id, first_book_id + books))
+
+    for user_id in range(first_user_id, first_user_id + users):
+        inserter.add(User, {'id': user_id, 'username': f'user{user_id}@seed.example.com',
+                            'password': password_hash})
+        for row in _alarms(rng, user_id, alarms_per_user, now):
+            inserter.add(Alarm, row)
+        for row in _sessions(rng, user_id, sessions_per_user, now, months, book_ids):
+            inserter.add(StudySession, row)
+        if progress and (user_id - first_user_id + 1) % 1000 == 0:
+            progress(user_id - first_user_id + 1, inserter.counts)
+
+    inserter.flush()
+    # Bulk inserts bypass the per-write rollup updates
+    inserter.counts['study_rollup'] = rollups.rebuild()
+    return inserter.counts
+
+
+@click.command('seed')
+@click.option('--users', default=1000, show_default=True, help='Users to create.')
+@click.option('--alarms-per-user', default=4, show_default=True)
+@click.option('--sessions-per-user', default=100, show_default=True)
+@click.option('--books', default=2000, show_default=True, help='Books added to the shared catalog.')
+@click.option('--months', default=6, show_default=True, help='How far back sessions go.')
+@click.option('--seed', 'random_seed', default=0, show_default=True, help='Random seed; same seed, same data.')
+@click.option('--chunk-size', default=10000, show_default=True, help='Rows per INSERT batch and commit.')
+def seed_command(users, alarms_per_user, sessions_per_user, books, months, random_seed, chunk_size):
+    """Bulk-insert synthetic users, alarms, study sessions and books."""
+    db.create_all()
+    start = time.perf_counter()
+
+    def progress(done, counts):
+        click.echo(f'  {done} users, {counts.get("study_session", 0)} sessions '
+                   f'({time.perf_counter() - start:.0f} s)')
+
+    counts = seed_database(users, alarms_per_user, sessions_per_user, books, months,
+                           random_seed, chunk_size, progress=progress)
+    for table, count in counts.items():
+        click.echo(f'{table}: {count} rows')
+    click.echo(f'Seeded in {time.perf_counter() - start:.1f} s')
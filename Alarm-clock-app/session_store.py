@@ -0,0 +1,228 @@
+"""Server-side sessions: the cookie holds a random session id, the data stays here.
+
+Two stores share one interface:
+
+- MemorySessionStore, a bounded LRU in this process (one worker process,
+  development, tests). Sessions are lost on restart and not seen by other
+  processes.
+- SQLiteSessionStore, a small SQLite file that every worker process on
+  the host reads and writes, and that scripts can invalidate.
+
+Either way at most `max_entries` sessions are kept. Anonymous sessions
+(e.g. one made just to flash a failed-login message) are evicted before
+any logged-in one, so a flood of bots cannot log real users out.
+"""
+import copy
+import os
+import re
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSession, SessionInterface
+
+SID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{43}$')
+
+
+def new_sid():
+    return secrets.token_urlsafe(32)
+
+
+class MemorySessionStore:
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # sid -> (data, expires_at), least recently used first
+        self._users = OrderedDict()
+        self._anonymous = OrderedDict()
+        self._by_user = {}   # user_id -> set of sids
+
+    def get(self, sid):
+        """(data, expires_at) for a live session, else None."""
+        with self._lock:
+            for entries in (self._users, self._anonymous):
+                entry = entries.get(sid)
+                if entry is not None:
+                    break
+            else:
+                return None
+            if entry[1] <= time.time():
+                self._drop(sid)
+                return None
+            entries.move_to_end(sid)
+            # A copy, so concurrent requests on one session don't share lists
+            return copy.deepcopy(entry[0]), entry[1]
+
+    def set(self, sid, data, expires_at):
+        data = copy.deepcopy(data)
+        user_id = data.get('user_id')
+        with self._lock:
+            self._drop(sid)
+            if user_id is None:
+                self._anonymous[sid] = (data, expires_at)
+            else:
+                self._users[sid] = (data, expires_at)
+                self._by_user.setdefault(user_id, set()).add(sid)
+            while len(self._users) + len(self._anonymous) > self.max_entries:
+                self._drop(next(iter(self._anonymous or self._users)))
+
+    def delete(self, sid):
+        with self._lock:
+            self._drop(sid)
+
+    def delete_user(self, user_id):
+        """End every session of `user_id`; return how many there were."""
+        with self._lock:
+            sids = list(self._by_user.get(user_id, ()))
+            for sid in sids:
+                self._drop(sid)
+        return len(sids)
+
+    def __len__(self):
+        return len(self._users) + len(self._anonymous)
+
+    def _drop(self, sid):
+        if self._anonymous.pop(sid, None) is not None:
+            return
+        entry = self._users.pop(sid, None)
+        if entry is not None:
+            user_id = entry[0]['user_id']
+            sids = self._by_user[user_id]
+            sids.discard(sid)
+            if not sids:
+                del self._by_user[user_id]
+
+
+class SQLiteSessionStore:
+    """Sessions in their own SQLite file, one connection per thread.
+
+    Expired rows, and the least recently saved beyond `max_entries`
+    (anonymous first), are deleted every `purge_every` saves.
+    """
+
+    def __init__(self, path, max_entries=100000, purge_every=1000):
+        self.path = path
+        self.max_entries = max_entries
+        self.purge_every = purge_every
+        self.serializer = TaggedJSONSerializer()
+        self._local = threading.local()
+        self._saves = 0
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS session ('
+                         'sid TEXT PRIMARY KEY, user_id INTEGER, data TEXT NOT NULL, '
+                         'expires_at REAL NOT NULL) WITHOUT ROWID')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_session_user ON session (user_id)')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_session_expires ON session (expires_at)')
+
+    def _connect(self):
+        # Per thread and per process: a forked worker opens its own
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, sid):
+        row = self._connect().execute(
+            'SELECT data, expires_at FROM session WHERE sid = ? AND expires_at > ?', (sid, time.time())
+        ).fetchone()
+        return None if row is None else (self.serializer.loads(row[0]), row[1])
+
+    def set(self, sid, data, expires_at):
+        conn = self._connect()
+        conn.execute('INSERT OR REPLACE INTO session (sid, user_id, data, expires_at) VALUES (?, ?, ?, ?)',
+                     (sid, data.get('user_id'), self.serializer.dumps(data), expires_at))
+        self._saves += 1
+        if self._saves % self.purge_every == 0:
+            self.purge()
+
+    def delete(self, sid):
+        self._connect().execute('DELETE FROM session WHERE sid = ?', (sid,))
+
+    def delete_user(self, user_id):
+        return self._connect().execute('DELETE FROM session WHERE user_id = ?', (user_id,)).rowcount
+
+    def purge(self):
+        conn = self._connect()
+        conn.execute('DELETE FROM session WHERE expires_at <= ?', (time.time(),))
+        conn.execute('DELETE FROM session WHERE sid IN (SELECT sid FROM session '
+                     'ORDER BY user_id IS NOT NULL, expires_at LIMIT max(0, (SELECT count(*) FROM session) - ?))',
+                     (self.max_entries,))
+
+    def __len__(self):
+        return self._connect().execute('SELECT count(*) FROM session').fetchone()[0]
+
+
+class ServerSideSession(SecureCookieSession):
+    """Flask's session dict, plus the id it is stored under."""
+
+    def __init__(self, initial=None, sid=None, expires_at=None):
+        super().__init__(initial)
+        self.sid = sid or new_sid()
+        self.new_sid = sid is None
+        self.expires_at = expires_at
+        self.previous_sid = None
+
+    def regenerate(self):
+        """Move to a fresh id (on login), so an id planted beforehand is useless."""
+        if not self.new_sid:
+            self.previous_sid = self.sid
+        self.sid, self.new_sid, self.modified = new_sid(), True, True
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Flask session interface over one of the stores above.
+
+    Data is kept for PERMANENT_SESSION_LIFETIME after its last save; the
+    cookie expires with the browser unless the session is permanent. A
+    session read with less than half its lifetime left is saved again, so
+    active users stay logged in.
+    """
+
+    session_class = ServerSideSession
+
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid and SID_PATTERN.match(sid):
+            stored = self.store.get(sid)
+            if stored is not None:
+                return self.session_class(stored[0], sid=sid, expires_at=stored[1])
+        # Unknown ids are never adopted: a new session gets a new id
+        return self.session_class()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session.previous_sid:
+            self.store.delete(session.previous_sid)
+
+        if not session:
+            if session.modified and not session.new_sid:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path,
+                                       secure=self.get_cookie_secure(app),
+                                       samesite=self.get_cookie_samesite(app),
+                                       httponly=self.get_cookie_httponly(app))
+            return
+
+        if session.accessed:
+            response.vary.add('Cookie')
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        now = time.time()
+        if session.modified or session.expires_at is None or session.expires_at - now < lifetime / 2:
+            self.store.set(session.sid, dict(session), now + lifetime)
+        if session.new_sid or (session.permanent and self.should_set_cookie(app, session)):
+            expires = self.get_expiration_time(app, session)
+            response.set_cookie(name, session.sid, expires=expires,
+                                httponly=self.get_cookie_httponly(app), domain=domain, path=path,
+                                secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app))
+            response.vary.add('Cookie')
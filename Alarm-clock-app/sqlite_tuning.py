@@ -0,0 +1,74 @@
+"""SQLite settings for running several worker processes on one database file."""
+import threading
+
+from sqlalchemy import event
+
+# Applied to every new DB-API connection
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',       # readers never block the writer, and vice versa
+    'synchronous': 'NORMAL',     # safe with WAL; fsync at checkpoints, not every commit
+    'busy_timeout': 30000,       # ms to wait for another process's write lock
+    'cache_size': -32000,        # KiB of page cache per connection
+    'temp_store': 'MEMORY',
+}
+
+# For `mode=ro` connections (routing.py): the journal mode is the primary's
+# to set, and query_only guards against a write slipping through
+READ_ONLY_PRAGMAS = {
+    'busy_timeout': 30000,
+    'cache_size': -32000,
+    'temp_store': 'MEMORY',
+    'query_only': 1,
+}
+
+
+def apply_pragmas(engine, pragmas=SQLITE_PRAGMAS):
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+
+class WriteSerializer:
+    """Single-writer queue for the sessions of one process.
+
+    A session joins the queue at its first INSERT/UPDATE/DELETE (an ORM
+    flush or a bulk statement) and leaves it when its transaction ends,
+    so at most one thread per process holds SQLite's write lock at a time
+    and the others wait here instead of failing with "database is locked".
+    Writers in other processes are serialized by SQLite itself through
+    `busy_timeout`; pysqlite only opens a transaction at the first write,
+    so no read snapshot ever needs upgrading to a write lock.
+    """
+
+    def __init__(self, timeout=30):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+
+    def install(self, session_target):
+        event.listen(session_target, 'before_flush', self._before_flush)
+        event.listen(session_target, 'do_orm_execute', self._before_execute)
+        event.listen(session_target, 'after_transaction_end', self._after_transaction_end)
+
+    def _acquire(self, session):
+        if session.info.get('holds_write_lock'):
+            return
+        if not self._lock.acquire(timeout=self.timeout):
+            raise RuntimeError('Timed out waiting for the database write lock')
+        session.info['holds_write_lock'] = True
+
+    def _before_flush(self, session, flush_context, instances):
+        self._acquire(session)
+
+    def _before_execute(self, orm_execute_state):
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            self._acquire(orm_execute_state.session)
+
+    def _after_transaction_end(self, session, transaction):
+        if transaction.parent is None and session.info.pop('holds_write_lock', False):
+            self._lock.release()
@@ -1,3 +1,65 @@
+// One /api/events stream per page, shared by home.js and dashboard.js.
+// The server caps open streams per worker and refuses the rest with a
+// 503, which EventSource does not retry: the page then polls through the
+// fallbacks registered with onAppEvent and tries the stream again later.
+const EVENTS_RETRY_MS = 60000;
+
+function appEvents() {
+    if (!window.appEvents) {
+        window.appEvents = { source: null, listeners: [], fallbacks: [], polling: false };
+        connectAppEvents();
+    }
+    return window.appEvents;
+}
+
+function connectAppEvents() {
+    const state = window.appEvents;
+    const source = new EventSource('/api/events');
+    state.source = source;
+    state.listeners.forEach(([event, handler]) => source.addEventListener(event, handler));
+    source.addEventListener('open', () => setAppEventsPolling(false));
+    source.addEventListener('error', () => {
+        // CONNECTING means the browser reconnects by itself
+        if (source.readyState === EventSource.CLOSED) {
+            setAppEventsPolling(true);
+            setTimeout(connectAppEvents, EVENTS_RETRY_MS);
+        }
+    });
+}
+
+function setAppEventsPolling(polling) {
+    const state = window.appEvents;
+    if (state.polling !== polling) {
+        state.polling = polling;
+        state.fallbacks.forEach(fallback => fallback(polling));
+    }
+}
+
+// `handler` runs for each `event`; `fallback(true)` starts polling while
+// the stream is refused and `fallback(false)` stops it
+function onAppEvent(event, handler, fallback) {
+    const state = appEvents();
+    state.listeners.push([event, handler]);
+    state.source.addEventListener(event, handler);
+    if (fallback) {
+        state.fallbacks.push(fallback);
+        if (state.polling) fallback(true);
+    }
+}
+
+// A fallback that calls `poll` every `intervalMs` while polling
+function pollingFallback(poll, intervalMs) {
+    let timer = null;
+    return function (polling) {
+        clearInterval(timer);
+        timer = null;
+        if (polling) {
+            poll();
+            timer = setInterval(poll, intervalMs);
+        }
+    };
+}
+
 document.addEventListener('DOMContentLoaded', function() {
     // Update date and time
     function updateDateTime() {
@@ -65,29 +127,28 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // Update stats through API
     function updateDashboardStats() {
-        fetch('/api/study-sessions')
+        fetch('/api/dashboard/stats')
             .then(response => response.json())
-            .then(data => {
-                // Update session stats
+            .then(({ data }) => {
                 const todaySessionsEl = document.querySelector('.today-sessions');
                 if (todaySessionsEl) {
-                    todaySessionsEl.textContent = `${data.today_count || 0} Sessions Today`;
+                    todaySessionsEl.textContent = `${data.today_sessions} Sessions Today`;
                 }
-            });
 
-        fetch('/api/alarms')
-            .then(response => response.json())
-            .then(data => {
-                // Update alarm stats
                 const activeAlarmsEl = document.querySelector('.active-alarms');
                 if (activeAlarmsEl) {
-                    activeAlarmsEl.textContent = `${data.data.filter(a => a.is_active).length} Active Alarms`;
+                    activeAlarmsEl.textContent = `${data.active_alarms} Active Alarms`;
+                }
+
+                const activeBooksEl = document.querySelector('.active-books');
+                if (activeBooksEl) {
+                    activeBooksEl.textContent = `${data.active_books} Active Books`;
                 }
             });
     }
 
     // Initial stats update
     updateDashboardStats();
-    // Update stats every 5 minutes
-    setInterval(updateDashboardStats, 300000);
+    // Refresh stats only when the server says they changed
+    onAppEvent('stats_changed', updateDashboardStats, pollingFallback(updateDashboardStats, 30000));
 });
\ No newline at end of file
@@ -55,6 +55,10 @@ const apiService = {
         return this.request('alarms');
     },
 
+    async getNextAlarm() {
+        return this.request('alarms/next');
+    },
+
     async createAlarm(alarmData) {
         return this.request('alarms', {
             method: 'POST',
@@ -73,6 +77,14 @@ const apiService = {
         return this.request(`alarms/${id}`, { 
             method: 'DELETE' 
         });
+    },
+
+    // Alarm history: fired, snoozed, dismissed
+    async logAlarm(id, action) {
+        return this.request('alarms/events', {
+            method: 'POST',
+            body: { alarm_id: id, action: action, occurred_at: new Date().toISOString() }
+        });
     }
 };
 
@@ -119,7 +131,7 @@ function showAlarmNotification(alarm) {
     playAlarmSound(alarm.sound_type, alarm.volume);
 
     // Log to database
-    apiService.logAlarm(alarm.id, 'triggered');
+    apiService.logAlarm(alarm.id, 'fired');
 }
 
 function hideAlarmNotification() {
@@ -129,33 +141,46 @@ function hideAlarmNotification() {
     currentAlarm = null;
 }
 
-// Check for active alarms
-function checkAlarms() {
-    const now = new Date();
-    const currentTime = now.toTimeString().slice(0, 5); // HH:MM format
-    const currentDay = now.getDay(); // 0 = Sunday, 6 = Saturday
+// Alarms are scheduled server-side and pushed over /api/events. While
+// the stream is refused, the next alarm is polled and rung by a timer.
+const ALARM_POLL_MS = 15000;
 
-    activeAlarms.forEach(alarm => {
-        if (!alarm.is_active || currentAlarm) return;
+function ringAlarm(alarm) {
+    if (!currentAlarm) {
+        showAlarmNotification(alarm);
+    }
+}
 
-        const shouldTrigger =
-            alarm.alarm_time === currentTime &&
-            checkRepeatCondition(alarm.repeat_type, currentDay);
+function alarmPollingFallback() {
+    let pollTimer = null;
+    let ringTimer = null;
+
+    async function pollNextAlarm() {
+        const next = (await apiService.getNextAlarm()).data;
+        clearTimeout(ringTimer);
+        ringTimer = null;
+        // Only arm alarms due before the poll after next
+        if (next && next.seconds_until * 1000 < 2 * ALARM_POLL_MS) {
+            ringTimer = setTimeout(() => {
+                ringAlarm(activeAlarms.find(a => a.id === next.id) || { id: next.id, name: next.alarm_time });
+            }, next.seconds_until * 1000);
+        }
+    }
 
-        if (shouldTrigger) {
-            showAlarmNotification(alarm);
+    return function (polling) {
+        clearInterval(pollTimer);
+        clearTimeout(ringTimer);
+        pollTimer = ringTimer = null;
+        if (polling) {
+            pollNextAlarm();
+            pollTimer = setInterval(pollNextAlarm, ALARM_POLL_MS);
         }
-    });
+    };
 }
 
-function checkRepeatCondition(repeatType, currentDay) {
-    switch (repeatType) {
-        case 'once': return true;
-        case 'daily': return true;
-        case 'weekdays': return currentDay >= 1 && currentDay <= 5; // Mon-Fri
-        case 'weekends': return currentDay === 0 || currentDay === 6; // Sat-Sun
-        default: return true;
-    }
+function listenForAlarms() {
+    onAppEvent('alarm_fired', e => ringAlarm(JSON.parse(e.data)), alarmPollingFallback());
+    onAppEvent('stats_changed', updateUI, pollingFallback(updateUI, 30000));
 }
 
 // Update UI functions
@@ -253,13 +278,13 @@ async function deleteAlarm(alarmId) {
 // Event Listeners
 document.addEventListener('DOMContentLoaded', function () {
     updateUI();
+    listenForAlarms();
 
-    // Update clock every second and check alarms
+    // Update clock every second
     setInterval(() => {
         const now = new Date();
         document.getElementById('current-time-display').textContent =
             now.toLocaleTimeString();
-        checkAlarms();
     }, 1000);
 
     // Alarm form submission
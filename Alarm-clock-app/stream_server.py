@@ -0,0 +1,160 @@
+"""Serves /api/events from one asyncio event loop instead of a thread per client.
+
+An open event stream is idle nearly all the time, so here each one is a
+coroutine parked on an asyncio.Event, not a request thread: one process
+holds thousands of them. Publishers (scheduler, change feed, status
+worker, all running in this process as in any worker) wake a stream
+through its Subscription's `on_push`. Only the handshake's session and
+user lookup, which read SQLite, runs in a small thread pool.
+
+Started by `python run_app.py --production --streams`; the reverse proxy
+sends /api/events here and everything else to the gunicorn workers.
+"""
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from events import StreamsFull
+
+logger = logging.getLogger(__name__)
+
+PATH = '/api/events'
+# Request line and headers; anything slower or larger is dropped
+HEAD_TIMEOUT = 10
+HEAD_LIMIT = 16384
+
+STREAM_HEAD = (b'HTTP/1.1 200 OK\r\n'
+               b'Content-Type: text/event-stream\r\n'
+               b'Cache-Control: no-cache\r\n'
+               b'X-Accel-Buffering: no\r\n'
+               b'Connection: close\r\n\r\n'
+               b'retry: 5000\n\n')
+
+
+def _error(status, reason, message, headers=()):
+    body = json.dumps({'error': message}).encode()
+    head = [f'HTTP/1.1 {status} {reason}', 'Content-Type: application/json',
+            f'Content-Length: {len(body)}', 'Connection: close', *headers]
+    return '\r\n'.join(head).encode() + b'\r\n\r\n' + body
+
+
+def _waker(loop, event):
+    """`on_push` for a subscription: sets `event` from a publisher's thread."""
+    def wake():
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:
+            pass  # the loop closed while shutting down
+    return wake
+
+
+def _parse_head(head):
+    """(method, path, {lower-case header: value}), or None if malformed."""
+    lines = head.decode('latin-1').split('\r\n')
+    parts = lines[0].split(' ')
+    if len(parts) != 3 or not parts[2].startswith('HTTP/1.'):
+        return None
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(':')
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    return parts[0], parts[1].split('?', 1)[0], headers
+
+
+class StreamServer:
+    def __init__(self, app, broker, load_user, heartbeat=25, auth_threads=4):
+        self.app = app
+        self.broker = broker
+        # Called in a request context built from the client's cookies;
+        # returns the user id, or None if not logged in
+        self.load_user = load_user
+        self.heartbeat = heartbeat
+        self._auth_pool = ThreadPoolExecutor(auth_threads, thread_name_prefix='stream-auth')
+
+    def _authenticate(self, cookie):
+        with self.app.test_request_context(PATH, headers={'Cookie': cookie} if cookie else {}):
+            return self.load_user()
+
+    async def handle(self, reader, writer):
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), HEAD_TIMEOUT)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            return
+        request = _parse_head(head)
+        if request is None or request[1] != PATH:
+            await self._reply(writer, _error(404, 'Not Found', 'Not found'))
+            return
+        if request[0] != 'GET':
+            await self._reply(writer, _error(405, 'Method Not Allowed', 'Method not allowed'))
+            return
+
+        loop = asyncio.get_running_loop()
+        try:
+            user_id = await loop.run_in_executor(self._auth_pool, self._authenticate, request[2].get('cookie'))
+        except Exception:
+            logger.exception('Event stream authentication failed')
+            await self._reply(writer, _error(500, 'Internal Server Error', 'Internal server error'))
+            return
+        if user_id is None:
+            await self._reply(writer, _error(401, 'Unauthorized', 'Unauthorized'))
+            return
+
+        wake = asyncio.Event()
+        try:
+            subscription = self.broker.subscribe(user_id, on_push=_waker(loop, wake))
+        except StreamsFull:
+            await self._reply(writer, _error(503, 'Service Unavailable', 'Too many open event streams',
+                                             ['Retry-After: 60']))
+            return
+        closed = asyncio.ensure_future(self._until_closed(reader))
+        try:
+            writer.write(STREAM_HEAD)
+            await writer.drain()
+            while True:
+                woken = asyncio.ensure_future(wake.wait())
+                done, _ = await asyncio.wait({woken, closed}, timeout=self.heartbeat,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                woken.cancel()
+                if closed in done:
+                    break
+                # Cleared before draining: a push from now on wakes the next round
+                wake.clear()
+                messages = []
+                while (message := subscription.get(0)) is not None:
+                    messages.append(message)
+                writer.write((''.join(messages) or ': keep-alive\n\n').encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            closed.cancel()
+            self.broker.unsubscribe(subscription)
+            writer.close()
+
+    @staticmethod
+    async def _until_closed(reader):
+        # The client sends nothing after its request; EOF means it left
+        try:
+            while await reader.read(1024):
+                pass
+        except ConnectionError:
+            pass
+
+    @staticmethod
+    async def _reply(writer, response):
+        try:
+            writer.write(response)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle, host, port, limit=HEAD_LIMIT, backlog=1024)
+        logger.info('Event streams on %s', ', '.join(str(sock.getsockname()) for sock in server.sockets))
+        async with server:
+            await server.serve_forever()
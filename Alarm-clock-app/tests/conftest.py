@@ -0,0 +1,54 @@
+import os
+import sys
+
+import pytest
+
+# Add the project root to sys.path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app import catalog_cache, create_app, dashboard_stats_cache, session_key_cache
+from models import db, User
+from passwords import hash_password
+
+PASSWORD = 'secret123'
+
+
+@pytest.fixture(scope='session')
+def app():
+    # One app for the whole run: the background workers are module-level
+    # and start with the first request
+    return create_app('testing')
+
+
+@pytest.fixture(autouse=True)
+def tables(app):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    # User ids start over with the tables
+    dashboard_stats_cache.invalidate_all()
+    session_key_cache.invalidate_all()
+    catalog_cache.bump()
+    yield
+    with app.app_context():
+        db.session.remove()
+
+
+@pytest.fixture
+def user(app):
+    with app.app_context():
+        user = User(username='user@example.com', password=hash_password(PASSWORD))
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+@pytest.fixture
+def client(app, user):
+    """A test client logged in through the login form."""
+    client = app.test_client()
+    response = client.post('/login', data={'username': 'user@example.com', 'password': PASSWORD})
+    assert response.status_code == 302 and response.location.endswith('/dashboard')
+    return client
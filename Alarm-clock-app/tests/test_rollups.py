@@ -0,0 +1,70 @@
+import rollups
+from models import db, StudyRollup
+
+
+def rollup_rows():
+    return sorted((row.user_id, row.kind, row.day, row.key, row.minutes, row.sessions)
+                  for row in StudyRollup.query if row.minutes or row.sessions)
+
+
+def assert_rollups_match_rebuild(app):
+    with app.app_context():
+        incremental = rollup_rows()
+        rollups.rebuild()
+        assert incremental == rollup_rows()
+        db.session.remove()
+        return incremental
+
+
+def create_sessions(client, count, **fields):
+    # Start times in the future, so the status worker leaves them alone
+    items = [{'subject': 'Maths', 'start_time': f'2030-01-0{day + 1} 09:00:00', 'duration': 30, **fields}
+             for day in range(count)]
+    response = client.post('/api/study-sessions/batch', json=items)
+    assert response.status_code == 200
+    return [result['id'] for result in response.get_json()['results']]
+
+
+def test_patch_updates_rollups(app, client):
+    ids = create_sessions(client, 3)
+    assert assert_rollups_match_rebuild(app) == []
+
+    response = client.patch('/api/study-sessions/batch', json=[
+        {'id': ids[0], 'status': 'completed'},
+        {'id': ids[1], 'status': 'completed', 'duration': 50, 'subject': 'Physics'},
+    ])
+    assert response.status_code == 200
+    rows = assert_rollups_match_rebuild(app)
+    assert sum(row[4] for row in rows if row[1] == 'total') == 80
+
+    # Moving a completed session to another day and subject
+    response = client.patch('/api/study-sessions/batch', json=[
+        {'id': ids[1], 'start_time': '2030-01-03 18:00:00', 'subject': 'Maths'},
+    ])
+    assert response.status_code == 200
+    assert_rollups_match_rebuild(app)
+
+    response = client.put(f'/api/study-sessions/{ids[2]}', json={'status': 'completed', 'duration': 20})
+    assert response.status_code == 200
+    rows = assert_rollups_match_rebuild(app)
+    assert sum(row[4] for row in rows if row[1] == 'total') == 100
+
+    response = client.put(f'/api/study-sessions/{ids[0]}', json={'status': 'upcoming'})
+    assert response.status_code == 200
+    rows = assert_rollups_match_rebuild(app)
+    assert sum(row[4] for row in rows if row[1] == 'total') == 70
+
+
+def test_delete_updates_rollups(app, client):
+    ids = create_sessions(client, 4, status='completed')
+    rows = assert_rollups_match_rebuild(app)
+    assert sum(row[5] for row in rows if row[1] == 'total') == 4
+
+    assert client.delete(f'/api/study-sessions/{ids[0]}').status_code == 200
+    rows = assert_rollups_match_rebuild(app)
+    assert sum(row[5] for row in rows if row[1] == 'total') == 3
+
+    response = client.delete('/api/study-sessions/batch', json=[{'id': ids[1]}, {'id': ids[2]}])
+    assert response.status_code == 200
+    rows = assert_rollups_match_rebuild(app)
+    assert sum(row[5] for row in rows if row[1] == 'total') == 1
@@ -0,0 +1,45 @@
+from app import session_key_cache
+from models import db, new_session_key, User
+
+
+def expire_cached_keys():
+    # What SESSION_KEY_MAX_AGE does in a process that did not make the change
+    session_key_cache.invalidate_all()
+
+
+def test_revoked_key_ends_session(app, client, user):
+    assert client.get('/api/dashboard/stats').status_code == 200
+    assert client.get('/clock').status_code == 200
+
+    with app.app_context():
+        db.session.get(User, user).session_key = new_session_key()
+        db.session.commit()
+    expire_cached_keys()
+
+    assert client.get('/api/dashboard/stats').status_code == 401
+    response = client.get('/clock')
+    assert response.status_code == 302 and '/login' in response.location
+
+
+def test_deleted_account_ends_session(app, client, user):
+    assert client.get('/api/alarms').status_code == 200
+    with app.app_context():
+        db.session.delete(db.session.get(User, user))
+        db.session.commit()
+    expire_cached_keys()
+    assert client.get('/api/alarms').status_code == 401
+
+
+def test_revocation_covers_every_session_until_next_login(app, client, user):
+    other = app.test_client()
+    other.post('/login', data={'username': 'user@example.com', 'password': 'secret123'})
+    with app.app_context():
+        db.session.get(User, user).session_key = new_session_key()
+        db.session.commit()
+    expire_cached_keys()
+    assert client.get('/api/alarms').status_code == 401
+    assert other.get('/api/alarms').status_code == 401
+
+    # Logging in again picks up the new key
+    other.post('/login', data={'username': 'user@example.com', 'password': 'secret123'})
+    assert other.get('/api/alarms').status_code == 200
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+from app import decode_cursor
+from models import db, Alarm
+
+
+def sync(client, since=None, **kwargs):
+    response = client.get('/api/alarms', query_string={'since': since} if since else {}, **kwargs)
+    assert response.status_code in (200, 304)
+    return response
+
+
+def test_full_list_then_deltas(client):
+    body = sync(client).get_json()
+    assert body == {'data': [], 'deleted': [], 'next_since': None}
+
+    first = client.post('/api/alarms', json={'name': 'a', 'alarm_time': '07:00'}).get_json()['id']
+    second = client.post('/api/alarms', json={'name': 'b', 'alarm_time': '08:00'}).get_json()['id']
+    body = sync(client).get_json()
+    assert [alarm['id'] for alarm in body['data']] == [first, second]
+    since = body['next_since']
+
+    # Nothing changed: an empty delta with the same watermark
+    body = sync(client, since).get_json()
+    assert body['data'] == [] and body['deleted'] == []
+    assert decode_cursor(body['next_since']) == decode_cursor(since)
+
+    client.put(f'/api/alarms/{first}', json={'volume': 10})
+    body = sync(client, since).get_json()
+    assert [alarm['id'] for alarm in body['data']] == [first]
+    since = body['next_since']
+
+    client.delete(f'/api/alarms/{second}')
+    body = sync(client, since).get_json()
+    assert body['data'] == [] and body['deleted'] == [second]
+
+
+def test_late_commit_with_early_timestamp_is_delivered(app, client):
+    alarm_id = client.post('/api/alarms', json={'name': 'a', 'alarm_time': '07:00'}).get_json()['id']
+    client.post('/api/alarms', json={'name': 'b', 'alarm_time': '08:00'})
+    since = sync(client).get_json()['next_since']
+
+    # A writer that stamped updated_at before the last sync, but committed after it
+    with app.app_context():
+        db.session.execute(db.update(Alarm).where(Alarm.id == alarm_id).values(
+            volume=11, updated_at=datetime.utcnow() - timedelta(minutes=5)))
+        db.session.commit()
+    body = sync(client, since).get_json()
+    assert [(alarm['id'], alarm['volume']) for alarm in body['data']] == [(alarm_id, 11)]
+
+
+def test_etag_and_invalid_token(client):
+    client.post('/api/alarms', json={'name': 'a', 'alarm_time': '07:00'})
+    response = sync(client)
+    etag = response.headers['ETag']
+    assert sync(client, headers={'If-None-Match': etag}).status_code == 304
+
+    client.post('/api/alarms', json={'name': 'b', 'alarm_time': '08:00'})
+    assert sync(client, headers={'If-None-Match': etag}).status_code == 200
+
+    assert client.get('/api/alarms', query_string={'since': 'not-a-token'}).status_code == 400
@@ -0,0 +1,89 @@
+from datetime import datetime
+
+import pytest
+
+from app import validate_alarm, validate_study_session
+
+
+def test_alarm_defaults():
+    values, error = validate_alarm({'name': 'Wake up', 'alarm_time': '07:30'})
+    assert error is None
+    assert values == {'name': 'Wake up', 'alarm_time': '07:30', 'repeat_type': 'once',
+                      'sound_type': 'bell', 'volume': 80, 'is_active': True}
+
+
+@pytest.mark.parametrize('data, error', [
+    (None, 'Expected an object'),
+    ({'alarm_time': '07:30'}, 'name is required'),
+    ({'name': 'a'}, 'alarm_time is required'),
+    ({'name': '', 'alarm_time': '07:30'}, 'name must be 1-100 characters'),
+    ({'name': 'a' * 101, 'alarm_time': '07:30'}, 'name must be 1-100 characters'),
+    ({'name': 'a', 'alarm_time': '7:30'}, 'alarm_time must be HH:MM'),
+    ({'name': 'a', 'alarm_time': '25:00'}, 'alarm_time must be HH:MM'),
+    ({'name': 'a', 'alarm_time': 730}, 'alarm_time must be HH:MM'),
+    ({'name': 'a', 'alarm_time': '07:30', 'repeat_type': 'hourly'}, 'repeat_type must be one of'),
+    ({'name': 'a', 'alarm_time': '07:30', 'sound_type': 'siren'}, 'sound_type must be one of'),
+    ({'name': 'a', 'alarm_time': '07:30', 'volume': 101}, 'volume must be an integer'),
+    ({'name': 'a', 'alarm_time': '07:30', 'volume': True}, 'volume must be an integer'),
+    ({'name': 'a', 'alarm_time': '07:30', 'is_active': 'yes'}, 'is_active must be a boolean'),
+])
+def test_alarm_errors(data, error):
+    values, message = validate_alarm(data)
+    assert values is None
+    assert message.startswith(error)
+
+
+def test_alarm_partial():
+    assert validate_alarm({}, partial=True) == ({}, None)
+    assert validate_alarm({'volume': 0, 'is_active': 0}, partial=True) == ({'volume': 0, 'is_active': False}, None)
+    assert validate_alarm({'alarm_time': 'noon'}, partial=True) == (None, 'alarm_time must be HH:MM')
+
+
+def test_study_session_defaults():
+    values, error = validate_study_session({'subject': 'Maths', 'start_time': '2030-01-01 09:00:00', 'duration': 45})
+    assert error is None
+    assert values == {'subject': 'Maths', 'start_time': datetime(2030, 1, 1, 9), 'duration': 45,
+                      'status': 'upcoming', 'notes': ''}
+
+
+@pytest.mark.parametrize('data, error', [
+    ([], 'Expected an object'),
+    ({'start_time': '2030-01-01 09:00:00', 'duration': 45}, 'subject is required'),
+    ({'subject': 'Maths', 'duration': 45}, 'start_time is required'),
+    ({'subject': 'Maths', 'start_time': '2030-01-01 09:00:00'}, 'duration is required'),
+    ({'subject': ' ', 'start_time': '2030-01-01 09:00:00', 'duration': 45}, 'subject must be 1-100 characters'),
+    ({'subject': 'Maths', 'start_time': '2030-01-01', 'duration': 45}, 'start_time must be'),
+    ({'subject': 'Maths', 'start_time': None, 'duration': 45}, 'start_time must be'),
+    ({'subject': 'Maths', 'start_time': '2030-01-01 09:00:00', 'duration': 0}, 'duration must be a positive'),
+    ({'subject': 'Maths', 'start_time': '2030-01-01 09:00:00', 'duration': '45'}, 'duration must be a positive'),
+    ({'subject': 'Maths', 'start_time': '2030-01-01 09:00:00', 'duration': 45, 'status': 'done'},
+     'status must be one of'),
+    ({'subject': 'Maths', 'start_time': '2030-01-01 09:00:00', 'duration': 45, 'notes': 3}, 'notes must be a string'),
+    ({'subject': 'Maths', 'start_time': '2030-01-01 09:00:00', 'duration': 45, 'book_id': '1'},
+     'book_id must be an integer'),
+])
+def test_study_session_errors(data, error):
+    values, message = validate_study_session(data)
+    assert values is None
+    assert message.startswith(error)
+
+
+def test_study_session_partial():
+    assert validate_study_session({}, partial=True) == ({}, None)
+    assert validate_study_session({'status': 'completed', 'book_id': None}, partial=True) == (
+        {'status': 'completed', 'book_id': None}, None)
+    assert validate_study_session({'status': 'finished'}, partial=True)[0] is None
+
+
+def test_study_session_routes_reject_bad_input(client):
+    response = client.post('/api/study-sessions', json={'subject': 'Maths', 'start_time': 'tomorrow', 'duration': 45})
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'start_time must be YYYY-MM-DD HH:MM:SS'}
+
+    response = client.post('/api/study-sessions', json={'subject': 'Maths', 'start_time': '2030-01-01 09:00:00',
+                                                        'duration': 45})
+    session_id = response.get_json()['id']
+    response = client.put(f'/api/study-sessions/{session_id}', json={'status': 'paused'})
+    assert response.status_code == 400
+    response = client.put(f'/api/study-sessions/{session_id}', json={'book_id': 999})
+    assert response.get_json() == {'error': 'book not found'}
@@ -0,0 +1,122 @@
+import atexit
+import logging
+import threading
+import time
+
+from models import db
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    """Buffers rows for one table and inserts them in batches.
+
+    A background thread flushes once `flush_size` rows are pending or the
+    oldest pending row is `flush_interval` seconds old, with one executemany
+    INSERT per flush. At most `max_pending` rows are held: `put()` refuses
+    more, so callers can push back instead of growing memory. Remaining
+    rows are flushed when the interpreter exits.
+    """
+
+    def __init__(self, model, max_pending=10000, flush_size=500, flush_interval=2.0):
+        self.model = model
+        self.max_pending = max_pending
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._cond = threading.Condition()
+        self._pending = []
+        self._oldest = None
+        self._flush_lock = threading.Lock()
+        self._app = None
+        self._thread = None
+        self._running = False
+        self.flushed = 0
+        self.flushes = 0
+
+    @property
+    def running(self):
+        return self._running
+
+    def __len__(self):
+        return len(self._pending)
+
+    def put(self, rows):
+        """Queue row dicts; False (nothing queued) if they would not fit."""
+        with self._cond:
+            if len(self._pending) + len(rows) > self.max_pending:
+                return False
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.extend(rows)
+            if len(self._pending) >= self.flush_size:
+                self._cond.notify()
+        return True
+
+    def start(self, app):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._app = app
+        self._thread = threading.Thread(target=self._run, name=f'{self.model.__tablename__}-writer',
+                                        daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def flush(self):
+        """Insert everything pending now, in the calling thread; False on error."""
+        with self._cond:
+            rows, self._pending, self._oldest = self._pending, [], None
+        if not rows or self._app is None:
+            return True
+        with self._flush_lock, self._app.app_context():
+            try:
+                db.session.execute(db.insert(self.model), rows)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                logger.exception('Failed to write %d %s rows', len(rows), self.model.__tablename__)
+                self._requeue(rows)
+                return False
+        self.flushed += len(rows)
+        self.flushes += 1
+        return True
+
+    def _requeue(self, rows):
+        # Keep what still fits for the next flush; newer rows take priority
+        with self._cond:
+            room = self.max_pending - len(self._pending)
+            if room < len(rows):
+                logger.error('Dropped %d %s rows', len(rows) - max(room, 0), self.model.__tablename__)
+            kept = rows[-room:] if room > 0 else []
+            self._pending[:0] = kept
+            if self._pending and self._oldest is None:
+                self._oldest = time.monotonic()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running:
+                    if len(self._pending) >= self.flush_size:
+                        break
+                    if self._pending:
+                        remaining = self._oldest + self.flush_interval - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    else:
+                        self._cond.wait()
+                if not self._running:
+                    return
+            if not self.flush():
+                # Wait out one interval before retrying instead of spinning
+                time.sleep(self.flush_interval)